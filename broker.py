@@ -1,25 +1,46 @@
 # broker.py
 import requests
 import config
-from utils import get_equity
+import risk
 
-OANDA_API_URL = "https://api-fxpractice.oanda.com/v3"
+OANDA_API_URL = config.OANDA_URL
 HEADERS = {
     "Authorization": f"Bearer {config.OANDA_API_KEY}",
     "Content-Type": "application/json"
 }
 
-def get_candles(instrument, count, granularity):
+def get_candles(instrument, count, granularity, to=None):
+    """The latest `count` candles, or the `count` candles before `to` (RFC3339) when given."""
     url = f"{OANDA_API_URL}/instruments/{instrument}/candles"
     params = {
         "count": count,
         "granularity": granularity,
         "price": "M"
     }
+    if to:
+        params["to"] = to
     response = requests.get(url, headers=HEADERS, params=params)
     response.raise_for_status()
     return response.json()["candles"]
 
+def get_candles_range(instrument, granularity, start, end, page_size=5000):
+    """
+    Fetches candles from start up to end (RFC3339 strings), paging forward.
+    The last page may run slightly past end; callers trim to the exact range.
+    """
+    url = f"{OANDA_API_URL}/instruments/{instrument}/candles"
+    candles = []
+    params = {"from": start, "granularity": granularity, "price": "M", "count": page_size}
+    while True:
+        response = requests.get(url, headers=HEADERS, params=params)
+        response.raise_for_status()
+        page = response.json()["candles"]
+        candles.extend(page)
+        if len(page) < page_size or page[-1]["time"] >= end:
+            break
+        params.update({"from": page[-1]["time"], "includeFirst": "false"})
+    return candles
+
 def get_open_trades():
     url = f"{OANDA_API_URL}/accounts/{config.OANDA_ACCOUNT_ID}/openTrades"
     response = requests.get(url, headers=HEADERS)
@@ -34,51 +55,93 @@ def close_position(instrument):
     }
     response = requests.put(url, headers=HEADERS, json=data)
     response.raise_for_status()
+    risk.apply_close(instrument)
     return response.json()
 
+def get_instruments():
+    url = f"{OANDA_API_URL}/accounts/{config.OANDA_ACCOUNT_ID}/instruments"
+    response = requests.get(url, headers=HEADERS)
+    response.raise_for_status()
+    return response.json()["instruments"]
+
+def get_account_summary():
+    url = f"{OANDA_API_URL}/accounts/{config.OANDA_ACCOUNT_ID}/summary"
+    response = requests.get(url, headers=HEADERS)
+    response.raise_for_status()
+    return response.json()["account"]
+
 def get_current_price(instrument):
+    """Mid price for the instrument. Home-currency conversion factors in the response are cached in risk."""
     url = f"{OANDA_API_URL}/accounts/{config.OANDA_ACCOUNT_ID}/pricing"
-    params = {"instruments": instrument}
+    params = {"instruments": instrument, "includeHomeConversions": "true"}
     response = requests.get(url, headers=HEADERS, params=params)
     response.raise_for_status()
-    prices = response.json()["prices"][0]
+    data = response.json()
+    prices = data["prices"][0]
+
+    factors = {c["currency"]: c["positionValue"] for c in data.get("homeConversions", [])}
+    quote_factors = prices.get("quoteHomeConversionFactors")
+    if quote_factors:
+        quote = instrument.partition("_")[2]
+        factors.setdefault(quote, (float(quote_factors["positiveUnits"]) + float(quote_factors["negativeUnits"])) / 2)
+    if factors:
+        risk.set_home_conversions(factors)
+
     return (float(prices["bids"][0]["price"]) + float(prices["asks"][0]["price"])) / 2
 
-def calculate_dynamic_units(price, equity, risk_percent=0.15, leverage=20):
-    risk_amount = equity * risk_percent
-    margin_per_unit = price / leverage
-    units = risk_amount / margin_per_unit
-    return int(units)
+def calculate_dynamic_units(price, equity, instrument=config.TRADING_INSTRUMENT, sl_pips=config.SL_PIPS):
+    """Units risking config.RISK_PER_TRADE of equity over the stop-loss distance."""
+    return risk.position_size(instrument, price, sl_pips, nav=equity)
 
-def place_trade(instrument, direction, tp_pips=15, sl_pips=10):
-    price = get_current_price(instrument)
-    equity = get_equity()
-    units = calculate_dynamic_units(price, equity)
+def open_trade(instrument, units, tp_pips=config.TP_PIPS, sl_pips=config.SL_PIPS, client_id=None, price=None):
+    """
+    Opens a market order trade based on signed units.
+    Positive = Buy, Negative = Sell. With positionFill REDUCE_FIRST an order larger
+    than the opposite position closes it and opens the remainder in one fill, on
+    hedging accounts too, where DEFAULT would open a hedge instead.
+    """
+    if price is None:
+        price = get_current_price(instrument)
 
-    side = "buy" if direction == 1 else "sell"
-    sl_price = price - sl_pips * 0.0001 if direction == 1 else price + sl_pips * 0.0001
-    tp_price = price + tp_pips * 0.0001 if direction == 1 else price - tp_pips * 0.0001
+    pip = risk.pip_size(instrument)
+    sl_price = price - sl_pips * pip if units > 0 else price + sl_pips * pip
+    tp_price = price + tp_pips * pip if units > 0 else price - tp_pips * pip
 
     order_data = {
         "order": {
             "instrument": instrument,
-            "units": str(units if direction == 1 else -units),
+            "units": str(int(units)),
             "type": "MARKET",
-            "positionFill": "DEFAULT",
-            "takeProfitOnFill": {"price": f"{tp_price:.5f}"},
-            "stopLossOnFill": {"price": f"{sl_price:.5f}"}
+            "positionFill": "REDUCE_FIRST",
+            "takeProfitOnFill": {"price": risk.format_price(instrument, tp_price)},
+            "stopLossOnFill": {"price": risk.format_price(instrument, sl_price)}
         }
     }
+    if client_id:
+        order_data["order"]["clientExtensions"] = {"id": client_id}
+        order_data["order"]["tradeClientExtensions"] = {"id": client_id}
 
     url = f"{OANDA_API_URL}/accounts/{config.OANDA_ACCOUNT_ID}/orders"
-    response = requests.post(url, headers=HEADERS, json=order_data)
+    response = requests.post(url, headers=HEADERS, json=order_data, timeout=config.ORDER_TIMEOUT)
     response.raise_for_status()
-    return response.json(), units
+    result = response.json()
 
-def open_trade(instrument, units):
-    """
-    Opens a market order trade based on signed units.
-    Positive = Buy, Negative = Sell.
-    """
-    direction = 1 if units > 0 else 0
-    return place_trade(instrument, direction)
\ No newline at end of file
+    fill = result.get("orderFillTransaction")
+    if fill:
+        risk.apply_fill(instrument, float(fill["units"]), float(fill["price"]))
+    return result
+
+def get_order(order_specifier):
+    """Looks up an order by ID or by client ID ("@<clientID>"). Returns None if unknown."""
+    url = f"{OANDA_API_URL}/accounts/{config.OANDA_ACCOUNT_ID}/orders/{order_specifier}"
+    response = requests.get(url, headers=HEADERS, timeout=config.ORDER_TIMEOUT)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()["order"]
+
+def get_transaction(transaction_id):
+    url = f"{OANDA_API_URL}/accounts/{config.OANDA_ACCOUNT_ID}/transactions/{transaction_id}"
+    response = requests.get(url, headers=HEADERS, timeout=config.ORDER_TIMEOUT)
+    response.raise_for_status()
+    return response.json()["transaction"]
\ No newline at end of file
@@ -3,11 +3,12 @@ import os
 # === OANDA API credentials ===
 OANDA_API_KEY = os.getenv("OANDA_API_KEY")
 OANDA_ACCOUNT_ID = os.getenv("OANDA_ACCOUNT_ID")
-OANDA_URL = "https://api-fxpractice.oanda.com/v3"  # Change if using live account
+OANDA_URL = os.getenv("OANDA_URL", "https://api-fxpractice.oanda.com/v3")  # Change if using live account or a local stub
 
 # === Telegram Bot settings ===
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")  # Point at a fake server for load tests
 
 # Use webhook (True) or polling (False) for Telegram updates
 TELEGRAM_USE_WEBHOOK = True
@@ -17,16 +18,62 @@ WEBHOOK_HOST = "https://forex-bot-m0qs.onrender.com"  # Replace with your Render
 WEBHOOK_PATH = f"/webhook/{TELEGRAM_TOKEN}"
 WEBHOOK_URL = f"{WEBHOOK_HOST}{WEBHOOK_PATH}"
 PORT = 8080  # Must match Flask app port
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 2))  # Threads processing queued updates
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", 100))  # Updates beyond this get a 503 so Telegram retries
+WEBHOOK_DEDUP_SIZE = 1000  # Recent update_ids remembered for deduplication
 
 # === Trading Configuration ===
 TRADING_INSTRUMENT = os.getenv("OANDA_INSTRUMENT", "GBP_USD")
 TRADING_UNITS = int(os.getenv("TRADE_UNITS", 1000))
-TRADING_PAUSED = False  # Can be toggled via Telegram /pause
+TRADING_PAUSED = False  # Default only; /pause and /resume persist the live value in state.py
+CONFIDENCE_THRESHOLD = 0.6  # Minimum model confidence to place a trade
+
+# === Risk Settings ===
+TP_PIPS = 15
+SL_PIPS = 10
+RISK_PER_TRADE = float(os.getenv("RISK_PER_TRADE", 0.005))  # Fraction of NAV lost if the stop loss is hit
+MAX_LEVERAGE = 20  # Max total notional exposure as a multiple of NAV
+MAX_MARGIN_USAGE = 0.5  # Max fraction of NAV tied up as margin
+
+# === Execution Settings ===
+ORDER_TIMEOUT = 10  # Seconds before an order request is abandoned and retried
+ORDER_RETRIES = 3
+ORDER_RETRY_DELAY = 0.5  # Seconds, multiplied by the attempt number
+EXECUTION_HISTORY = 200  # Recent fills kept in memory for latency stats
+
+STATE_PATH = "bot_state.db"  # SQLite file backing state.py
 
 # === Model & Training Settings ===
 MODEL_PATH = "model.pkl"
 CANDLE_COUNT = 3999
 TIMEFRAME = "M15"
+TIME_SCALE = float(os.getenv("TIME_SCALE", 1))  # Speeds up scheduler intervals, e.g. 100 against oanda_sim.py
+SIM_CLOCK_URL = os.getenv("SIM_CLOCK_URL")  # e.g. http://127.0.0.1:8081/sim/clock so gating and retrain timing follow simulated time
+
+# === Logging ===
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = "logs/bot.jsonl"  # JSON lines, rotated at midnight UTC and by size
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 7  # Rotated files kept, newest first as bot.jsonl.1
+LOG_QUEUE_SIZE = 10000  # Records beyond this are dropped rather than blocking the caller
+MODEL_REPORT_PATH = "model_report.json"  # Per-backend profile from the last retrain
+MODEL_BACKENDS = os.getenv("MODEL_BACKENDS", "rf,hgb,logreg,ensemble").split(",")
+MODEL_LATENCY_BUDGET_MS = float(os.getenv("MODEL_LATENCY_BUDGET_MS", 25))  # Per prediction; a cycle costs this per instrument
+MODEL_LATENCY_SAMPLES = 20  # Single-row predictions timed per backend
+MODEL_MIN_COVERAGE = 5.0  # % of test bars above the confidence threshold for confident accuracy to count
+HISTORY_CACHE_DIR = "history"  # Cached candles used by replay.py
+
+# === Model Health Monitoring ===
+MODEL_STATS_PATH = "model_stats.json"  # Training feature summary saved alongside the model
+DRIFT_BINS = 10  # Quantile bins per feature
+DRIFT_DECAY = 0.99  # Per-cycle decay of live statistics (~100 cycle memory)
+DRIFT_PSI_THRESHOLD = 0.25  # Lowest population stability index that counts as drift
+DRIFT_LIMIT_MARGIN = 3.0  # Drift limit as a multiple of the worst PSI seen replaying the training window
+CALIBRATION_GAP_THRESHOLD = 0.15  # Mean confidence minus realised accuracy
+MONITOR_MIN_SAMPLES = 60  # Effective observations before drift can trigger a retrain
+MONITOR_PENDING = 20  # Predictions awaiting a TP/SL outcome
+RETRAIN_COOLDOWN_HOURS = 6
+MAX_MODEL_AGE_HOURS = 72  # Retrain regardless of drift after this long
 
 # === Compatibility Aliases ===
 INSTRUMENT = TRADING_INSTRUMENT
@@ -0,0 +1,126 @@
+# execution.py
+"""
+Order execution: one netting order per signal, client order IDs for safe
+retries, and signal-to-fill latency and slippage tracking.
+"""
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+import requests
+
+import config
+import broker
+import risk
+
+logger = logging.getLogger(__name__)
+_fills = deque(maxlen=config.EXECUTION_HISTORY)
+_fills_lock = threading.Lock()
+
+def new_client_id():
+    return f"bot-{uuid.uuid4().hex[:16]}"
+
+def _is_retryable(error):
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    return response is not None and (response.status_code >= 500 or response.status_code == 429)
+
+def _already_sent(error):
+    """True when OANDA rejected a resend because the client ID was already used."""
+    response = getattr(error, "response", None)
+    if response is None or response.status_code != 400:
+        return False
+    try:
+        return response.json().get("errorCode") == "CLIENT_ORDER_ID_ALREADY_EXISTS"
+    except ValueError:
+        return False
+
+def _recover_fill(instrument, client_id):
+    """Returns the fill for an order that reached OANDA before its response was lost."""
+    order = broker.get_order(f"@{client_id}")
+    if order is None:
+        return None
+    if order.get("state") != "FILLED":
+        return {"orderCancelTransaction": {"reason": order.get("state")}}
+    fill = broker.get_transaction(order["fillingTransactionID"])
+    risk.apply_fill(instrument, float(fill["units"]), float(fill["price"]))
+    return {"orderFillTransaction": fill}
+
+def _lookup_fill(instrument, client_id):
+    """Like _recover_fill, but a transient lookup failure means "unknown" rather than an error."""
+    try:
+        return _recover_fill(instrument, client_id)
+    except requests.RequestException as e:
+        if not _is_retryable(e):
+            raise
+        logger.warning("Order lookup failed", extra={"client_order_id": client_id, "error": str(e)})
+        return None
+
+def submit_order(instrument, units, client_id, price=None):
+    """
+    Sends a market order, retrying transient failures under the same client ID.
+    Before each retry the client ID is looked up so an order is never sent twice.
+    If the lookup fails too, the order is resent under the same ID, which OANDA
+    rejects if the earlier attempt arrived, and the lookup is tried again.
+    """
+    for attempt in range(1, config.ORDER_RETRIES + 1):
+        try:
+            return broker.open_trade(instrument, units, client_id=client_id, price=price)
+        except requests.RequestException as e:
+            if not _is_retryable(e) and not _already_sent(e):
+                raise
+            error = e
+            logger.warning("Order attempt failed", extra={"client_order_id": client_id, "attempt": attempt, "error": str(e)})
+        time.sleep(config.ORDER_RETRY_DELAY * attempt)
+        recovered = _lookup_fill(instrument, client_id)
+        if recovered is not None:
+            return recovered
+    raise error
+
+def execute_signal(instrument, target_units, predicted_price, signal_time):
+    """
+    Moves the net position to target_units with a single order and records
+    latency from signal_time (time.monotonic()) to fill and slippage in pips.
+    """
+    order_units = int(target_units - risk.net_units(instrument))
+    client_id = new_client_id()
+    result = submit_order(instrument, order_units, client_id, price=predicted_price)
+    latency_ms = (time.monotonic() - signal_time) * 1000
+
+    fill = result.get("orderFillTransaction")
+    if fill is None:
+        reason = result.get("orderCancelTransaction", {}).get("reason", "unknown")
+        raise RuntimeError(f"Order {client_id} was not filled: {reason}")
+
+    fill_price = float(fill["price"])
+    side = 1 if order_units > 0 else -1
+    # Positive slippage means a worse price than predicted
+    slippage_pips = (fill_price - predicted_price) * side / risk.pip_size(instrument)
+
+    record = {
+        "client_order_id": client_id,
+        "instrument": instrument,
+        "units": order_units,
+        "predicted_price": predicted_price,
+        "fill_price": fill_price,
+        "slippage_pips": round(slippage_pips, 2),
+        "latency_ms": round(latency_ms, 1)
+    }
+    with _fills_lock:
+        _fills.append(record)
+    return record
+
+def latency_summary():
+    with _fills_lock:
+        fills = list(_fills)
+    if not fills:
+        return {"fills": 0, "avg_latency_ms": 0.0, "max_latency_ms": 0.0, "avg_slippage_pips": 0.0}
+    latencies = [f["latency_ms"] for f in fills]
+    return {
+        "fills": len(fills),
+        "avg_latency_ms": round(sum(latencies) / len(latencies), 1),
+        "max_latency_ms": max(latencies),
+        "avg_slippage_pips": round(sum(f["slippage_pips"] for f in fills) / len(fills), 2)
+    }
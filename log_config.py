@@ -0,0 +1,138 @@
+# log_config.py
+"""
+Structured logging: callers only enqueue records, and a background listener
+writes them as JSON lines to a size- and time-rotated file and as text to
+the console. Each scheduler job runs under its own correlation ID.
+"""
+import contextlib
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import uuid
+from datetime import datetime, timezone
+
+import config
+
+correlation_id = contextvars.ContextVar("correlation_id", default=None)
+_listener = None
+dropped_records = 0
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "cycle_id"}
+
+class CorrelationFilter(logging.Filter):
+    """Stamps records with the current cycle's correlation ID on the calling thread."""
+
+    def filter(self, record):
+        record.cycle_id = correlation_id.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "cycle": getattr(record, "cycle_id", None),
+            "msg": record.getMessage()
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: records are dropped and counted when the queue is full."""
+
+    def enqueue(self, record):
+        global dropped_records
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records += 1
+
+    def prepare(self, record):
+        """
+        Merges args into msg but, unlike the stock prepare, keeps the traceback
+        out of it: it travels as exc_text, which every formatter renders.
+        """
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+class DailyRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotates whenever the file would exceed maxBytes and on the first record after
+    midnight UTC. Backups are numbered .1 (newest) to .backupCount (oldest).
+    """
+
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, **kwargs)
+        if os.path.exists(self.baseFilename):
+            self._day = datetime.fromtimestamp(os.path.getmtime(self.baseFilename), timezone.utc).date()
+        else:
+            self._day = datetime.now(timezone.utc).date()
+
+    @staticmethod
+    def _record_day(record):
+        return datetime.fromtimestamp(record.created, timezone.utc).date()
+
+    def shouldRollover(self, record):
+        if self._record_day(record) != self._day and os.path.exists(self.baseFilename) \
+                and os.path.getsize(self.baseFilename) > 0:
+            return True
+        return super().shouldRollover(record)
+
+    def emit(self, record):
+        super().emit(record)
+        self._day = self._record_day(record)
+
+def setup(level=config.LOG_LEVEL, log_file=config.LOG_FILE):
+    """Configures the root logger once; later calls are no-ops."""
+    global _listener
+    if _listener is not None:
+        return
+
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+    file_handler = DailyRotatingFileHandler(
+        log_file, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - [%(cycle_id)s] %(message)s"))
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=config.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(CorrelationFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.handlers[:] = [queue_handler]
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, file_handler, console_handler)
+    _listener.start()
+
+def shutdown():
+    """Flushes queued records; call before the process exits."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+@contextlib.contextmanager
+def cycle(name):
+    """Tags every record logged inside the block with a fresh correlation ID."""
+    token = correlation_id.set(f"{name}-{uuid.uuid4().hex[:8]}")
+    try:
+        yield correlation_id.get()
+    finally:
+        correlation_id.reset(token)
@@ -1,20 +1,25 @@
 import os
 import time
+import logging
 import threading
-from datetime import datetime
 from flask import Flask, request
 from apscheduler.schedulers.background import BackgroundScheduler
 import pytz  # ✅ Required for APScheduler timezones
 
 import config
+import log_config
 import broker
+import execution
 import model
+import monitor
+import risk
+import state
 import telegram_bot
 import trade_logger
-from utils import is_market_open, is_safe_trading_time, get_equity
+from utils import is_market_open, is_safe_trading_time, utc_now
 
 app = Flask(__name__)
-SCHEDULER_LOG_FILE = "scheduler_log.txt"
+logger = logging.getLogger("bot")
 
 # ✅ Use pytz.utc as required by APScheduler
 scheduler = BackgroundScheduler(timezone=pytz.utc)
@@ -28,7 +33,11 @@ def home():
 
 @app.route(f'/webhook/{config.TELEGRAM_TOKEN}', methods=['POST'])
 def webhook():
-    telegram_bot.handle_webhook(request.get_json(force=True))
+    result = telegram_bot.handle_webhook(request.get_json(force=True, silent=True))
+    if result == telegram_bot.WEBHOOK_INVALID:
+        return "Invalid update", 400
+    if result == telegram_bot.WEBHOOK_BUSY:
+        return "Busy", 503
     return "Webhook received", 200
 
 # ─────────────────────────────
@@ -36,25 +45,26 @@ def webhook():
 # ─────────────────────────────
 def safe_job(func):
     def wrapper():
-        try:
-            print(f"[APScheduler] Running job: {func.__name__} at {datetime.utcnow()}")
-            func()
-        except Exception as e:
-            print(f"[APScheduler ERROR] Job '{func.__name__}' failed: {e}")
-            telegram_bot.send_text(f"❌ Job '{func.__name__}' error: {e}")
+        with log_config.cycle(func.__name__):
+            try:
+                logger.debug("Running job", extra={"job": func.__name__})
+                func()
+            except Exception as e:
+                logger.exception("Job failed", extra={"job": func.__name__})
+                telegram_bot.send_text(f"❌ Job '{func.__name__}' error: {e}")
     return wrapper
 
 # ─────────────────────────────
 # 🔁 Prediction & Trading Logic
 # ─────────────────────────────
 def predict_and_trade():
-    print(f"[{datetime.utcnow()}] ✅ predict_and_trade() called")
+    logger.info("predict_and_trade called")
 
-    if config.TRADING_PAUSED:
-        reason = "⏸️ Bot paused"
+    if state.get("trading_paused", config.TRADING_PAUSED):
+        reason = trade_logger.SKIP_PAUSED
         telegram_bot.send_text(f"📭 Trade skipped: {reason}")
         trade_logger.log_skipped_trade({
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_now().isoformat(),
             "direction": None,
             "confidence": None,
             "reason_skipped": reason,
@@ -63,10 +73,10 @@ def predict_and_trade():
         return
 
     if not is_market_open():
-        reason = "❌ Market closed"
+        reason = trade_logger.SKIP_MARKET_CLOSED
         telegram_bot.send_text(f"📭 Trade skipped: {reason}")
         trade_logger.log_skipped_trade({
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_now().isoformat(),
             "direction": None,
             "confidence": None,
             "reason_skipped": reason,
@@ -75,10 +85,10 @@ def predict_and_trade():
         return
 
     if not is_safe_trading_time():
-        reason = "🚫 Avoiding volatile trading hour"
+        reason = trade_logger.SKIP_VOLATILE_HOUR
         telegram_bot.send_text(f"📭 Trade skipped: {reason}")
         trade_logger.log_skipped_trade({
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_now().isoformat(),
             "direction": None,
             "confidence": None,
             "reason_skipped": reason,
@@ -87,7 +97,7 @@ def predict_and_trade():
         return
 
     result = model.predict_from_latest_candles()
-    print(f"[MODEL] Prediction result: {result}")
+    signal_time = time.monotonic()
 
     if result is None or len(result) != 3:
         raise ValueError("Model returned invalid prediction result")
@@ -95,22 +105,21 @@ def predict_and_trade():
     direction, confidence, indicators = result
 
     # Update last prediction
-    telegram_bot.last_prediction.update({
+    state.set("last_prediction", {
         "direction": direction,
         "confidence": confidence,
         "indicators": indicators,
-        "timestamp": datetime.utcnow()
+        "timestamp": utc_now()
     })
     telegram_bot.send_prediction_alert(direction, confidence)
 
-    emoji = "🟢 Buy" if direction == 1 else "🔴 Sell" if direction == 0 else "⚪ Hold"
-    print(f"[PREDICT] {emoji}, confidence: {confidence:.2f}")
+    logger.info("Prediction", extra={"direction": direction, "confidence": confidence, "indicators": indicators})
 
-    if confidence < 0.6:
-        reason = f"⚠️ Low confidence ({confidence:.2f})"
+    if confidence < config.CONFIDENCE_THRESHOLD:
+        reason = trade_logger.low_confidence_reason(confidence)
         telegram_bot.send_text(f"📭 Trade skipped: {reason}")
         trade_logger.log_skipped_trade({
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_now().isoformat(),
             "direction": direction,
             "confidence": confidence,
             "reason_skipped": reason,
@@ -127,10 +136,10 @@ def predict_and_trade():
     )
 
     if same_direction_held:
-        reason = f"Already holding a {emoji} position"
+        reason = trade_logger.already_holding_reason(direction)
         telegram_bot.send_text(f"📭 Trade skipped: {reason}")
         trade_logger.log_skipped_trade({
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_now().isoformat(),
             "direction": direction,
             "confidence": confidence,
             "reason_skipped": reason,
@@ -138,74 +147,81 @@ def predict_and_trade():
         })
         return
 
-    has_open_trade = any(pos["instrument"] == config.TRADING_INSTRUMENT for pos in current_positions)
-    if has_open_trade:
-        print("[BOT] Existing open trade detected — closing.")
-        broker.close_position(config.TRADING_INSTRUMENT)
-
-    print("[BOT] Placing new trade...")
+    risk.sync_positions(current_positions)
+    risk.refresh_account()
     price = broker.get_current_price(config.TRADING_INSTRUMENT)
-    equity = get_equity()
-    units = broker.calculate_dynamic_units(price, equity)
+    units = risk.position_size(config.TRADING_INSTRUMENT, price)
     signed_units = units if direction == 1 else -units
 
-    broker.open_trade(config.TRADING_INSTRUMENT, signed_units)
+    allowed, risk_reason = risk.check_trade(config.TRADING_INSTRUMENT, signed_units, price)
+    if not allowed:
+        reason = f"🛑 Risk limit: {risk_reason}"
+        telegram_bot.send_text(f"📭 Trade skipped: {reason}")
+        trade_logger.log_skipped_trade({
+            "timestamp": utc_now().isoformat(),
+            "direction": direction,
+            "confidence": confidence,
+            "reason_skipped": reason,
+            "indicators": indicators
+        })
+        return
+
+    if risk.net_units(config.TRADING_INSTRUMENT):
+        logger.info("Existing open trade detected — flipping with a single order")
+
+    fill = execution.execute_signal(config.TRADING_INSTRUMENT, signed_units, price, signal_time)
+    logger.info("Order filled", extra=fill)
 
     trade_logger.log_trade({
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": utc_now().isoformat(),
         "direction": direction,
         "confidence": confidence,
         "indicators": indicators
     })
+    trade_logger.log_execution({"timestamp": utc_now().isoformat(), **fill})
 
     telegram_bot.send_trade_alert(direction, confidence, "buy" if direction == 1 else "sell", signed_units)
 
 # ─────────────────────────────
 # 📅 Other Scheduled Jobs
 # ─────────────────────────────
-def retrain_daily():
-    print("[BOT] Running daily retrain...")
+def check_model_health():
+    needed, reason = monitor.needs_retrain()
+    if not needed:
+        return
+    logger.info("Retraining", extra={"reason": reason})
     model.retrain_model()
-    telegram_bot.last_retrain_time = datetime.utcnow()
-    telegram_bot.send_text("🧠 Retrain finished.")
-
-def log_scheduler_activity():
-    timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    log_line = f"{timestamp} - [SCHEDULER] Checked tasks\n"
-    with open(SCHEDULER_LOG_FILE, "a") as f:
-        f.write(log_line)
-    print(log_line.strip())
-
-def reset_scheduler_log():
-    with open(SCHEDULER_LOG_FILE, "w") as f:
-        f.write("")
-    print("[SCHEDULER] Scheduler log reset.")
+    telegram_bot.send_text(f"🧠 Retrain finished ({reason}).")
 
 def heartbeat():
-    print(f"[HEARTBEAT] Bot alive at {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("Heartbeat", extra={
+        "jobs": len(scheduler.get_jobs()),
+        "webhook_queue": telegram_bot.update_queue.qsize(),
+        "dropped_log_records": log_config.dropped_records
+    })
 
 # ─────────────────────────────
 # ▶️ Start Bot
 # ─────────────────────────────
 if __name__ == "__main__":
-    print("✅ Bot is live: 15-min prediction + daily retrain at 23:00 UTC")
+    log_config.setup()
+    logger.info("✅ Bot is live: 15-min prediction + drift-triggered retrain")
+    risk.load_instruments()
 
-    if not os.path.exists(config.MODEL_PATH):
-        print("[INIT] No model.pkl found — training now...")
-        model.retrain_model()
-        telegram_bot.last_retrain_time = datetime.utcnow()
+    with log_config.cycle("startup"):
+        if not os.path.exists(config.MODEL_PATH):
+            logger.info("No model.pkl found — training now")
+            model.retrain_model()
 
-    # Run prediction immediately on startup
-    predict_and_trade()
+        # Run prediction immediately on startup
+        predict_and_trade()
 
     # Schedule jobs via APScheduler
-    scheduler.add_job(safe_job(predict_and_trade), 'interval', minutes=15)
-    scheduler.add_job(safe_job(retrain_daily), 'cron', hour=23, minute=0)
-    scheduler.add_job(safe_job(log_scheduler_activity), 'interval', minutes=1)
-    scheduler.add_job(safe_job(heartbeat), 'interval', minutes=1)
-    scheduler.add_job(safe_job(reset_scheduler_log), 'cron', hour=0, minute=0)
+    scheduler.add_job(safe_job(predict_and_trade), 'interval', seconds=15 * 60 / config.TIME_SCALE)
+    scheduler.add_job(safe_job(check_model_health), 'interval', seconds=15 * 60 / config.TIME_SCALE)
+    scheduler.add_job(safe_job(heartbeat), 'interval', seconds=60 / config.TIME_SCALE)
     scheduler.start()
-    print("[SCHEDULER] APScheduler started")
+    logger.info("APScheduler started")
 
     if config.TELEGRAM_USE_WEBHOOK:
         telegram_bot.setup_webhook()
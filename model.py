@@ -1,23 +1,39 @@
 # model.py
+import os
+import json
+import threading
+import time
 import numpy as np
 import pandas as pd
 import joblib
 from ta.momentum import RSIIndicator, StochasticOscillator, ROCIndicator
 from ta.trend import SMAIndicator, MACD, ADXIndicator
 from ta.volatility import AverageTrueRange, BollingerBands
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.calibration import CalibratedClassifierCV
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 
 import broker
 import config
-
-TP_PIPS = 15
-SL_PIPS = 10
-PIP_VALUE = 0.0001  # for GBP/USD
-
-def preprocess_candles(candles):
+import model_backends
+import monitor
+import risk
+import state
+from utils import utc_now
+
+TP_PIPS = config.TP_PIPS
+SL_PIPS = config.SL_PIPS
+LIVE_CANDLE_COUNT = 50  # Candles fetched for each live prediction
+
+FEATURES = [
+    "rsi", "macd", "sma5", "sma15", "stoch", "roc", "atr", "hour",
+    "body_ratio", "range", "ma_slope",
+    "vwap", "bb_percent", "adx"
+]
+
+_model_cache = {"mtime": None, "model": None}
+_retrain_lock = threading.Lock()  # The scheduler and /retrain can both retrain
+
+def preprocess_candles(candles, vwap_window=None):
     df = pd.DataFrame([{
         "time": c["time"],
         "open": float(c["mid"]["o"]),
@@ -39,7 +55,11 @@ def preprocess_candles(candles):
     df["atr"] = AverageTrueRange(high=df["high"], low=df["low"], close=df["close"]).average_true_range()
 
     # New indicators
-    df["vwap"] = (df["close"] * df["volume"]).cumsum() / df["volume"].cumsum()
+    # Live predictions see a VWAP over their short candle window; training and replays pass that window explicitly
+    if vwap_window:
+        df["vwap"] = (df["close"] * df["volume"]).rolling(vwap_window).sum() / df["volume"].rolling(vwap_window).sum()
+    else:
+        df["vwap"] = (df["close"] * df["volume"]).cumsum() / df["volume"].cumsum()
     bb = BollingerBands(close=df["close"])
     df["bb_percent"] = bb.bollinger_pband()
 
@@ -55,7 +75,9 @@ def preprocess_candles(candles):
     df.dropna(inplace=True)
     return df
 
-def label_tp_sl(df, tp_pips=TP_PIPS, sl_pips=SL_PIPS, pip_value=PIP_VALUE):
+def label_tp_sl(df, tp_pips=TP_PIPS, sl_pips=SL_PIPS, pip_value=None):
+    if pip_value is None:
+        pip_value = risk.pip_size(config.TRADING_INSTRUMENT)
     labels = []
     closes = df["close"].values
     highs = df["high"].values
@@ -87,50 +109,63 @@ def label_tp_sl(df, tp_pips=TP_PIPS, sl_pips=SL_PIPS, pip_value=PIP_VALUE):
 
 def create_features_labels(df):
     df = label_tp_sl(df)
-    features = [
-        "rsi", "macd", "sma5", "sma15", "stoch", "roc", "atr", "hour",
-        "body_ratio", "range", "ma_slope",
-        "vwap", "bb_percent", "adx"
-    ]
-    X = df[features]
+    X = df[FEATURES]
     y = df["direction"]
     return X, y
 
 def retrain_model():
-    candles = broker.get_candles(
-        instrument=config.TRADING_INSTRUMENT,
-        count=config.CANDLE_COUNT,
-        granularity=config.TIMEFRAME
-    )
-    df = preprocess_candles(candles)
-    X, y = create_features_labels(df)
-
-    base_model = RandomForestClassifier(n_estimators=100, random_state=42)
-    model = CalibratedClassifierCV(base_model, method='sigmoid', cv=5)
-    model.fit(X, y)
-
-    joblib.dump(model, config.MODEL_PATH)
+    with _retrain_lock:
+        candles = broker.get_candles(
+            instrument=config.TRADING_INSTRUMENT,
+            count=config.CANDLE_COUNT,
+            granularity=config.TIMEFRAME
+        )
+        df = preprocess_candles(candles, vwap_window=LIVE_CANDLE_COUNT - 1)
+        X, y = create_features_labels(df.copy())
+
+        results, selected = model_backends.compare(X, y)
+        start = time.perf_counter()
+        model = model_backends.build(selected["backend"])
+        model.fit(X, y)
+        selected = {**selected, "full_fit_time_s": round(time.perf_counter() - start, 2)}
+
+        # Write then swap so a concurrent prediction never loads a half-written file
+        tmp_path = f"{config.MODEL_PATH}.{os.getpid()}.tmp"
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, config.MODEL_PATH)
+        # Every bar counts for drift, not just those whose TP/SL outcome resolved
+        monitor.fit_reference(df[FEATURES], df["close"])
+        state.set("last_retrain_time", utc_now())
+        state.set("model_backend", selected)
+
+        with open(config.MODEL_REPORT_PATH, "w") as f:
+            json.dump({"selected": selected, "samples": len(X), "backends": results}, f, indent=2)
+
+def load_model():
+    """Returns the saved model, reloading only when the file has been replaced."""
+    mtime = os.stat(config.MODEL_PATH).st_mtime_ns
+    if _model_cache["mtime"] != mtime:
+        _model_cache.update({"model": joblib.load(config.MODEL_PATH), "mtime": mtime})
+    return _model_cache["model"]
 
 def predict_from_latest_candles():
     candles = broker.get_candles(
         instrument=config.TRADING_INSTRUMENT,
-        count=50,
+        count=LIVE_CANDLE_COUNT,
         granularity=config.TIMEFRAME
     )
     df = preprocess_candles(candles)
     if df.empty:
         raise Exception("No valid candle data for prediction")
 
-    model = joblib.load(config.MODEL_PATH)
-    X = df.iloc[-1:][[
-        "rsi", "macd", "sma5", "sma15", "stoch", "roc", "atr", "hour",
-        "body_ratio", "range", "ma_slope",
-        "vwap", "bb_percent", "adx"
-    ]]
+    model = load_model()
+    X = df.iloc[-1:][FEATURES]
     proba = model.predict_proba(X)[0]
-    prediction = model.predict(X)[0]
+    prediction = model.classes_[proba.argmax()]
+    indicators = X.to_dict("records")[0]
 
-    return int(prediction), float(max(proba)), X.to_dict("records")[0]
+    monitor.observe(df, indicators, int(prediction), float(max(proba)))
+    return int(prediction), float(max(proba)), indicators
 
 def backtest_model():
     candles = broker.get_candles(
@@ -138,13 +173,13 @@ def backtest_model():
         count=config.CANDLE_COUNT,
         granularity=config.TIMEFRAME
     )
-    df = preprocess_candles(candles)
+    df = preprocess_candles(candles, vwap_window=LIVE_CANDLE_COUNT - 1)
     X, y = create_features_labels(df)
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.25, shuffle=False)
 
-    base_model = RandomForestClassifier(n_estimators=100, random_state=42)
-    model = CalibratedClassifierCV(base_model, method='sigmoid', cv=5)
+    backend = state.get("model_backend", {}).get("backend", "rf")
+    model = model_backends.build(backend)
     model.fit(X_train, y_train)
 
     y_train_pred = model.predict(X_train)
@@ -154,7 +189,7 @@ def backtest_model():
     train_acc = accuracy_score(y_train, y_train_pred) * 100
     test_acc = accuracy_score(y_test, y_test_pred) * 100
 
-    confident_mask = (y_prob.max(axis=1) >= 0.60)
+    confident_mask = (y_prob.max(axis=1) >= config.CONFIDENCE_THRESHOLD)
     confident_acc = accuracy_score(
         y_test[confident_mask],
         y_test_pred[confident_mask]
@@ -163,6 +198,7 @@ def backtest_model():
     coverage = confident_mask.sum() / len(y_test) * 100
 
     return {
+        "backend": backend,
         "samples": len(X),
         "train_accuracy": round(train_acc, 2),
         "test_accuracy": round(test_acc, 2),
@@ -0,0 +1,115 @@
+# model_backends.py
+"""
+Pluggable model backends for retrain_model.
+
+Each backend is trained on the same time-ordered split and profiled for
+train time, single-row inference latency, serialised size and backtest
+quality. The most accurate backend that fits the latency budget is chosen,
+so lighter models can take over when many instruments share a cycle.
+"""
+import logging
+import pickle
+import time
+
+import numpy as np
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# === Backends ===
+
+def _random_forest():
+    return CalibratedClassifierCV(RandomForestClassifier(n_estimators=100, random_state=42), method="sigmoid", cv=5)
+
+def _hist_gradient_boosting():
+    # A fixed number of iterations: early stopping would hold out a random, not time-ordered, slice
+    return HistGradientBoostingClassifier(max_iter=200, learning_rate=0.05, early_stopping=False, random_state=42)
+
+def _logistic_regression():
+    return make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+
+def _ensemble():
+    return VotingClassifier([
+        ("rf", RandomForestClassifier(n_estimators=100, min_samples_leaf=5, random_state=42)),
+        ("hgb", _hist_gradient_boosting()),
+        ("logreg", _logistic_regression())
+    ], voting="soft")
+
+BACKENDS = {
+    "rf": _random_forest,
+    "hgb": _hist_gradient_boosting,
+    "logreg": _logistic_regression,
+    "ensemble": _ensemble
+}
+
+def build(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{name}' (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+# === Profiling & Selection ===
+
+def _inference_latency_ms(model, X):
+    """Median latency of a single-row predict_proba, as served each live cycle."""
+    row = X.iloc[-1:]
+    timings = []
+    for _ in range(config.MODEL_LATENCY_SAMPLES):
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def evaluate(name, X_train, y_train, X_test, y_test):
+    model = build(name)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_time = time.perf_counter() - start
+
+    y_prob = model.predict_proba(X_test)
+    y_pred = model.classes_[y_prob.argmax(axis=1)]
+    confident_mask = y_prob.max(axis=1) >= config.CONFIDENCE_THRESHOLD
+    confident_acc = accuracy_score(y_test[confident_mask], y_pred[confident_mask]) * 100 if confident_mask.any() else 0.0
+
+    return {
+        "backend": name,
+        "train_time_s": round(train_time, 2),
+        "latency_ms": round(_inference_latency_ms(model, X_test), 3),
+        "size_kb": round(len(pickle.dumps(model)) / 1024, 1),
+        "test_accuracy": round(accuracy_score(y_test, y_pred) * 100, 2),
+        "confident_accuracy": round(confident_acc, 2),
+        "confidence_coverage": round(float(confident_mask.mean()) * 100, 2)
+    }
+
+def _score(result):
+    # Confident accuracy only counts when the model trades often enough to measure it
+    quality = result["confident_accuracy"] if result["confidence_coverage"] >= config.MODEL_MIN_COVERAGE else 0.0
+    return quality, result["test_accuracy"], -result["latency_ms"]
+
+def select(results, latency_budget_ms=config.MODEL_LATENCY_BUDGET_MS):
+    """Best-scoring backend within the latency budget, or the fastest if none fits."""
+    within_budget = [r for r in results if r["latency_ms"] <= latency_budget_ms]
+    if not within_budget:
+        logger.warning("No backend fits the latency budget", extra={"budget_ms": latency_budget_ms})
+        return min(results, key=lambda r: r["latency_ms"])
+    return max(within_budget, key=_score)
+
+def compare(X, y, names=None, test_size=0.25):
+    """Profiles each backend on a time-ordered split and returns (results, selected)."""
+    names = names or config.MODEL_BACKENDS
+    split = int(len(X) * (1 - test_size))
+    X_train, X_test = X.iloc[:split], X.iloc[split:]
+    y_train, y_test = y.iloc[:split], y.iloc[split:]
+
+    results = []
+    for name in names:
+        result = evaluate(name, X_train, y_train, X_test, y_test)
+        logger.info("Backend evaluated", extra=result)
+        results.append(result)
+    return results, select(results)
@@ -0,0 +1,254 @@
+# monitor.py
+"""
+Model health: feature drift against the training distribution and rolling
+calibration of confidence against realised TP/SL outcomes.
+
+Training data is summarised as per-feature quantile bins saved next to the
+model. Live statistics are exponentially decayed bin counts and sums, so
+memory stays constant however long the bot runs. Only bars the live gating
+would trade are summarised, and price-denominated features are compared
+relative to close so a trending price alone does not count as drift.
+"""
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import config
+import state
+from utils import granularity_delta, market_open_mask, safe_trading_mask, utc_now
+
+EPSILON = 1e-4
+REFERENCE_VERSION = 2
+RELATIVE_FEATURES = ("sma5", "sma15", "vwap")  # Price levels, compared as distance from close
+SCALED_FEATURES = ("macd", "atr", "range", "ma_slope")  # Price distances, compared as a fraction of close
+EXCLUDED_FEATURES = ("hour",)  # Live gating only ever sees session hours
+
+_lock = threading.Lock()
+_reference = None
+_live_bins = {}
+_live_weight = 0.0
+_pending = deque(maxlen=config.MONITOR_PENDING)
+_calibration = {"weight": 0.0, "confidence": 0.0, "accuracy": 0.0, "brier": 0.0}
+
+# === Reference Statistics ===
+
+def _reset_live():
+    global _live_weight
+    _live_bins.clear()
+    _live_weight = 0.0
+    _pending.clear()
+    _calibration.update({"weight": 0.0, "confidence": 0.0, "accuracy": 0.0, "brier": 0.0})
+
+def _drift_values(features, close):
+    """Maps a feature row (dict) or frame to the values compared for drift."""
+    values = {}
+    for name, value in features.items():
+        if name in EXCLUDED_FEATURES:
+            continue
+        if name in RELATIVE_FEATURES:
+            value = value / close - 1
+        elif name in SCALED_FEATURES:
+            value = value / close
+        values[name] = value
+    return values
+
+def _smoothed(counts, weight):
+    # One pseudo-observation per bin keeps a few quiet bins from reading as extreme drift
+    return (counts + 1) / (np.asarray(weight)[..., None] + counts.shape[-1])
+
+def _window_psi(expected, bin_index):
+    """PSI of the decayed live window after each row, as if the rows had been observed live in order."""
+    counts = np.zeros((len(bin_index), len(expected)))
+    running = np.zeros(len(expected))
+    for i, b in enumerate(bin_index):
+        running *= config.DRIFT_DECAY
+        running[b] += 1.0
+        counts[i] = running
+    weights = counts.sum(axis=1)
+    psi = _psi(expected, _smoothed(counts, weights), axis=1)
+    return psi[weights >= config.MONITOR_MIN_SAMPLES]
+
+def fit_reference(X, close, path=config.MODEL_STATS_PATH):
+    """
+    Summarises the training features of tradeable bars as quantile bins and saves them
+    with the model. X is indexed by candle open time; close is the matching close price.
+    """
+    global _reference
+    decision_times = pd.to_datetime(X.index, utc=True) + granularity_delta(config.TIMEFRAME)
+    tradeable = np.asarray(market_open_mask(decision_times) & safe_trading_mask(decision_times))
+    drift_values = _drift_values(X[tradeable], close[tradeable])
+
+    quantiles = np.linspace(0, 1, config.DRIFT_BINS + 1)[1:-1]
+    features = {}
+    for name, column in drift_values.items():
+        values = column.to_numpy(dtype=float)
+        edges = np.unique(np.quantile(values, quantiles))
+        bin_index = np.searchsorted(edges, values, side="right")
+        counts = np.bincount(bin_index, minlength=len(edges) + 1)
+        expected = counts / counts.sum()
+        # Autocorrelated features wander across bins even when nothing changes, so the limit
+        # is scaled from the worst live-sized window seen when replaying the training data
+        window_psi = _window_psi(expected, bin_index)
+        worst_window = float(window_psi.max()) if len(window_psi) else 0.0
+        features[name] = {
+            "edges": edges.tolist(),
+            "expected": expected.tolist(),
+            "psi_limit": max(config.DRIFT_PSI_THRESHOLD, config.DRIFT_LIMIT_MARGIN * worst_window)
+        }
+
+    reference = {
+        "version": REFERENCE_VERSION,
+        "trained_at": utc_now().isoformat(),
+        "samples": int(tradeable.sum()),
+        "features": features
+    }
+    with open(path, "w") as f:
+        json.dump(reference, f)
+
+    with _lock:
+        _reference = reference
+        _reset_live()
+    return reference
+
+def load_reference(path=config.MODEL_STATS_PATH):
+    global _reference
+    if _reference is None and os.path.exists(path):
+        with open(path) as f:
+            reference = json.load(f)
+        # Statistics from older releases were binned differently; wait for the next retrain
+        if reference.get("version") == REFERENCE_VERSION:
+            _reference = reference
+    return _reference
+
+# === Live Updates ===
+
+def _observe_features(row):
+    global _live_weight
+    for name, ref in _reference["features"].items():
+        if name not in row:
+            continue
+        bins = _live_bins.setdefault(name, np.zeros(len(ref["expected"])))
+        bins *= config.DRIFT_DECAY
+        bins[np.searchsorted(ref["edges"], row[name], side="right")] += 1
+    _live_weight = _live_weight * config.DRIFT_DECAY + 1
+
+def _resolve_pending(df):
+    """Scores earlier predictions whose TP/SL outcome is now visible in the candle window."""
+    from model import label_tp_sl
+
+    if not _pending:
+        return
+    labels = label_tp_sl(df[["open", "high", "low", "close"]].copy())["direction"]
+    positions = {t: i for i, t in enumerate(df.index)}
+    horizon = len(df) - 6  # Rows with five later bars have had every chance to resolve
+
+    still_pending = []
+    for entry in _pending:
+        candle_time, direction, confidence = entry
+        if candle_time in labels.index:
+            correct = float(direction == labels[candle_time])
+            decay = config.DRIFT_DECAY
+            _calibration["weight"] = _calibration["weight"] * decay + 1
+            _calibration["confidence"] = _calibration["confidence"] * decay + confidence
+            _calibration["accuracy"] = _calibration["accuracy"] * decay + correct
+            _calibration["brier"] = _calibration["brier"] * decay + (confidence - correct) ** 2
+        elif candle_time in positions and positions[candle_time] < horizon:
+            continue  # Neither TP nor SL hit, so no outcome to score
+        elif candle_time in positions:
+            still_pending.append(entry)
+    _pending.clear()
+    _pending.extend(still_pending)
+
+def observe(df, features, direction, confidence):
+    """Updates drift and calibration statistics with one live prediction."""
+    with _lock:
+        if load_reference() is None:
+            return
+        _observe_features(_drift_values(features, df["close"].iloc[-1]))
+        _resolve_pending(df)
+        _pending.append((df.index[-1], direction, confidence))
+
+# === Reporting ===
+
+def _psi(expected, actual, axis=None):
+    expected = np.maximum(np.asarray(expected), EPSILON)
+    actual = np.maximum(actual, EPSILON)
+    return np.sum((actual - expected) * np.log(actual / expected), axis=axis)
+
+def summary():
+    with _lock:
+        if load_reference() is None:
+            return {"active": False}
+
+        drift = {
+            name: float(_psi(ref["expected"], _smoothed(_live_bins[name], _live_weight)))
+            for name, ref in _reference["features"].items()
+            if name in _live_bins and _live_weight
+        }
+        features = _reference["features"]
+        worst = max(drift, key=lambda name: drift[name] / features[name]["psi_limit"]) if drift else None
+        weight = _calibration["weight"]
+        calibration = {
+            "samples": round(weight, 1),
+            "confidence": _calibration["confidence"] / weight if weight else None,
+            "accuracy": _calibration["accuracy"] / weight if weight else None,
+            "brier": _calibration["brier"] / weight if weight else None
+        }
+        if weight:
+            calibration["gap"] = calibration["confidence"] - calibration["accuracy"]
+        else:
+            calibration["gap"] = None
+
+        return {
+            "active": True,
+            "trained_at": _reference["trained_at"],
+            "samples": round(_live_weight, 1),
+            "drift": drift,
+            "worst_feature": worst,
+            "max_psi": drift[worst] if worst else 0.0,
+            "psi_limit": features[worst]["psi_limit"] if worst else config.DRIFT_PSI_THRESHOLD,
+            "calibration": calibration
+        }
+
+def _model_trained_at():
+    """Training time from the saved statistics, falling back to state and then the model file."""
+    reference = load_reference()
+    if reference is not None:
+        return datetime.fromisoformat(reference["trained_at"])
+    last_retrain = state.get("last_retrain_time")
+    if last_retrain is not None:
+        return last_retrain
+    if os.path.exists(config.MODEL_PATH):
+        return datetime.utcfromtimestamp(os.path.getmtime(config.MODEL_PATH))
+    return None
+
+def needs_retrain():
+    """
+    Returns (needed, reason) based on model age, feature drift and calibration.
+    The age limit applies even when no training statistics exist yet.
+    """
+    trained_at = _model_trained_at()
+    if trained_at is None:
+        return False, None
+
+    age_hours = (utc_now() - trained_at).total_seconds() / 3600
+    if age_hours >= config.MAX_MODEL_AGE_HOURS:
+        return True, f"model is {age_hours:.0f}h old"
+
+    health = summary()
+    if not health["active"] or age_hours < config.RETRAIN_COOLDOWN_HOURS:
+        return False, None
+
+    if health["samples"] >= config.MONITOR_MIN_SAMPLES and health["max_psi"] > health["psi_limit"]:
+        return True, f"drift in {health['worst_feature']} (PSI {health['max_psi']:.2f} > {health['psi_limit']:.2f})"
+
+    calibration = health["calibration"]
+    if calibration["samples"] >= config.MONITOR_MIN_SAMPLES and calibration["gap"] > config.CALIBRATION_GAP_THRESHOLD:
+        return True, f"overconfident by {calibration['gap']:.2f}"
+
+    return False, None
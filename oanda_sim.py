@@ -0,0 +1,505 @@
+# oanda_sim.py
+"""
+Local OANDA v20-compatible simulator for offline load and latency testing.
+
+Serves the endpoints the bot uses (candles, pricing, openTrades, orders,
+transactions, position close, account summary, instruments) from a synthetic
+random-walk or recorded price path that advances `speed` times faster than
+real time. Latency, errors and lost order responses can be injected.
+
+Usage:
+    python oanda_sim.py --speed 100 --latency-ms 40 --error-rate 0.01
+    OANDA_URL=http://127.0.0.1:8081/v3 OANDA_ACCOUNT_ID=sim TIME_SCALE=100 \
+        SIM_CLOCK_URL=http://127.0.0.1:8081/sim/clock python main.py
+
+Request counts and latencies per endpoint are served at /sim/stats. With
+SIM_CLOCK_URL set, the bot's session gating, journal timestamps and retrain
+timing follow the simulated clock served at /sim/clock.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+from flask import Flask, request, jsonify, g
+
+app = Flask(__name__)
+
+BASE_BAR = pd.Timedelta(minutes=1)
+DEFAULT_INSTRUMENTS = {"GBP_USD": 1.27, "EUR_USD": 1.08, "USD_JPY": 150.0}
+
+settings = {
+    "speed": 1.0,
+    "latency_ms": 0.0,
+    "error_rate": 0.0,
+    "lost_response_rate": 0.0,
+    "spread_pips": 1.0,
+    "volatility": 0.0003,  # Per-bar log-return standard deviation
+    "history_days": 60,
+    "currency": "GBP",
+    "hedging": False,  # With hedging, positionFill DEFAULT opens new trades instead of netting
+    "margin_rate": 0.05
+}
+
+_lock = threading.RLock()
+_rng = np.random.default_rng(42)
+_clock = {"wall": time.monotonic(), "sim": pd.Timestamp.now(tz="UTC").floor("min")}
+_paths = {}  # instrument -> DataFrame of base bars indexed by open time
+_recorded = set()  # Instruments replaying a fixed path
+_account = {"balance": 10000.0, "last_id": 0}
+_trades = {}  # trade id -> trade
+_orders = {}  # order id -> order
+_client_orders = {}  # client id -> order id
+_transactions = {}
+_stats = defaultdict(lambda: {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+
+# === Clock & Price Paths ===
+
+def sim_now():
+    return _clock["sim"] + pd.Timedelta(seconds=(time.monotonic() - _clock["wall"]) * settings["speed"])
+
+def _next_id():
+    _account["last_id"] += 1
+    return str(_account["last_id"])
+
+def _pip(instrument):
+    return 0.01 if instrument.endswith("_JPY") else 0.0001
+
+def _precision(instrument):
+    return 3 if instrument.endswith("_JPY") else 5
+
+def _random_bars(start_time, start_price, count):
+    returns = _rng.normal(0, settings["volatility"], count)
+    closes = start_price * np.exp(np.cumsum(returns))
+    opens = np.concatenate([[start_price], closes[:-1]])
+    wick = np.abs(_rng.normal(0, settings["volatility"] / 2, (2, count))) * closes
+    return pd.DataFrame({
+        "o": opens,
+        "h": np.maximum(opens, closes) + wick[0],
+        "l": np.minimum(opens, closes) - wick[1],
+        "c": closes,
+        "volume": _rng.integers(20, 200, count)
+    }, index=pd.date_range(start_time, periods=count, freq=BASE_BAR))
+
+def _path(instrument):
+    """Returns base bars up to the current simulated time, extending synthetic paths as needed."""
+    now = sim_now()
+    path = _paths.get(instrument)
+    if path is None:
+        if instrument not in DEFAULT_INSTRUMENTS:
+            raise KeyError(instrument)
+        start = _clock["sim"] - pd.Timedelta(days=settings["history_days"])
+        count = int((now - start) / BASE_BAR) + 1
+        path = _paths[instrument] = _random_bars(start, DEFAULT_INSTRUMENTS[instrument], count)
+    elif instrument not in _recorded:
+        missing = int((now - path.index[-1]) / BASE_BAR)
+        if missing > 0:
+            extra = _random_bars(path.index[-1] + BASE_BAR, path["c"].iloc[-1], missing)
+            path = _paths[instrument] = pd.concat([path, extra])
+    return path.loc[:now]
+
+def load_recorded(instrument, candles_path):
+    """Loads OANDA-format candles (e.g. a replay.py history cache) as the instrument's path."""
+    global BASE_BAR
+    with open(candles_path) as f:
+        candles = json.load(f)
+    df = pd.DataFrame({
+        "o": [float(c["mid"]["o"]) for c in candles],
+        "h": [float(c["mid"]["h"]) for c in candles],
+        "l": [float(c["mid"]["l"]) for c in candles],
+        "c": [float(c["mid"]["c"]) for c in candles],
+        "volume": [int(c["volume"]) for c in candles]
+    }, index=pd.to_datetime([c["time"] for c in candles], utc=True))
+    BASE_BAR = pd.Series(df.index).diff().median()
+    _paths[instrument] = df
+    _recorded.add(instrument)
+    _clock["sim"] = min(df.index[0] + pd.Timedelta(days=settings["history_days"]), df.index[-1])
+
+def _mid(instrument):
+    return float(_path(instrument)["c"].iloc[-1])
+
+def _quote(instrument):
+    mid = _mid(instrument)
+    half_spread = settings["spread_pips"] * _pip(instrument) / 2
+    return mid - half_spread, mid + half_spread
+
+def _fmt(instrument, price):
+    return f"{price:.{_precision(instrument)}f}"
+
+def _time(ts):
+    return ts.strftime("%Y-%m-%dT%H:%M:%S.000000000Z")
+
+# === Trading State ===
+
+def _rate(currency, target):
+    """Mid rate converting one unit of currency into target through a direct pair, or None."""
+    if currency == target:
+        return 1.0
+    for instrument, inverted in ((f"{currency}_{target}", False), (f"{target}_{currency}", True)):
+        if instrument in _paths or instrument in DEFAULT_INSTRUMENTS:
+            mid = _mid(instrument)
+            return 1 / mid if inverted else mid
+    return None
+
+def _home_rate(currency):
+    """Account-currency value of one unit of currency, crossing through USD when needed."""
+    home = settings["currency"]
+    direct = _rate(currency, home)
+    if direct is not None:
+        return direct
+    to_usd, usd_to_home = _rate(currency, "USD"), _rate("USD", home)
+    if to_usd is None or usd_to_home is None:
+        raise KeyError(f"No conversion from {currency} to {home}")
+    return to_usd * usd_to_home
+
+def _to_home(instrument, amount, price):
+    base, _, quote = instrument.partition("_")
+    if quote == settings["currency"]:
+        return amount
+    if base == settings["currency"]:
+        return amount / price
+    return amount * _home_rate(quote)
+
+def _unrealized(trade):
+    bid, ask = _quote(trade["instrument"])
+    exit_price = bid if trade["units"] > 0 else ask
+    return _to_home(trade["instrument"], trade["units"] * (exit_price - trade["price"]), exit_price)
+
+def _close_units(trade, units, price, reason):
+    """Closes `units` (same sign as the trade) of a trade and books the realised P/L."""
+    pl = _to_home(trade["instrument"], units * (price - trade["price"]), price)
+    _account["balance"] += pl
+    trade["units"] -= units
+    if trade["units"] == 0:
+        del _trades[trade["id"]]
+    return {"tradeID": trade["id"], "units": str(-units), "price": _fmt(trade["instrument"], price),
+            "realizedPL": f"{pl:.4f}", "reason": reason}
+
+def _advance():
+    """Fills take-profit and stop-loss orders touched by bars since each trade was last checked."""
+    for trade in list(_trades.values()):
+        bars = _path(trade["instrument"]).loc[trade["checked"]:]
+        long = trade["units"] > 0
+        for ts, bar in bars.iloc[1:].iterrows():
+            sl_hit = trade["sl"] and (bar["l"] <= trade["sl"] if long else bar["h"] >= trade["sl"])
+            tp_hit = trade["tp"] and (bar["h"] >= trade["tp"] if long else bar["l"] <= trade["tp"])
+            if sl_hit or tp_hit:
+                # Assume the stop is hit first when a bar spans both levels
+                price = trade["sl"] if sl_hit else trade["tp"]
+                _close_units(trade, trade["units"], price, "STOP_LOSS_ORDER" if sl_hit else "TAKE_PROFIT_ORDER")
+                break
+        else:
+            trade["checked"] = bars.index[-1]
+
+def _fill_market_order(order):
+    instrument = order["instrument"]
+    units = int(order["units"])
+    bid, ask = _quote(instrument)
+    price = ask if units > 0 else bid
+    fill = {"id": _next_id(), "type": "ORDER_FILL", "orderID": order["id"], "instrument": instrument,
+            "units": str(units), "price": _fmt(instrument, price), "time": _time(sim_now()), "tradesClosed": []}
+
+    position_fill = order.get("positionFill", "DEFAULT")
+    if position_fill == "DEFAULT":
+        position_fill = "OPEN_ONLY" if settings["hedging"] else "REDUCE_FIRST"
+
+    # Reducing fills net against opposite trades (FIFO) before opening any remainder
+    remaining = units
+    reducible = [] if position_fill == "OPEN_ONLY" else sorted(_trades.values(), key=lambda t: int(t["id"]))
+    for trade in reducible:
+        if trade["instrument"] != instrument or trade["units"] * remaining >= 0:
+            continue
+        closing = -remaining if abs(remaining) < abs(trade["units"]) else trade["units"]
+        fill["tradesClosed"].append(_close_units(trade, closing, price, "MARKET_ORDER"))
+        remaining += closing
+        if remaining == 0:
+            break
+
+    if remaining and position_fill != "REDUCE_ONLY":
+        trade_id = fill["id"]
+        _trades[trade_id] = {
+            "id": trade_id, "instrument": instrument, "units": remaining, "initialUnits": remaining,
+            "price": price, "openTime": fill["time"], "checked": _path(instrument).index[-1],
+            "tp": float(order.get("takeProfitOnFill", {}).get("price", 0)) or None,
+            "sl": float(order.get("stopLossOnFill", {}).get("price", 0)) or None,
+            "clientExtensions": order.get("tradeClientExtensions")
+        }
+        fill["tradeOpened"] = {"tradeID": trade_id, "units": str(remaining), "price": fill["price"]}
+
+    _transactions[fill["id"]] = fill
+    return fill
+
+def _trade_json(trade):
+    result = {
+        "id": trade["id"], "instrument": trade["instrument"], "price": _fmt(trade["instrument"], trade["price"]),
+        "openTime": trade["openTime"], "state": "OPEN", "initialUnits": str(trade["initialUnits"]),
+        "currentUnits": str(trade["units"]), "unrealizedPL": f"{_unrealized(trade):.4f}"
+    }
+    if trade["clientExtensions"]:
+        result["clientExtensions"] = trade["clientExtensions"]
+    return result
+
+def _account_summary():
+    unrealized = sum(_unrealized(t) for t in _trades.values())
+    margin_used = sum(
+        _to_home(t["instrument"], abs(t["units"]) * _mid(t["instrument"]), _mid(t["instrument"])) * settings["margin_rate"]
+        for t in _trades.values()
+    )
+    nav = _account["balance"] + unrealized
+    return {
+        "currency": settings["currency"], "balance": f"{_account['balance']:.4f}", "NAV": f"{nav:.4f}",
+        "unrealizedPL": f"{unrealized:.4f}", "marginUsed": f"{margin_used:.4f}",
+        "marginAvailable": f"{nav - margin_used:.4f}", "openTradeCount": len(_trades),
+        "hedgingEnabled": settings["hedging"],
+        "lastTransactionID": str(_account["last_id"])
+    }
+
+def _error(status, code, message):
+    return jsonify({"errorCode": code, "errorMessage": message}), status
+
+# === Fault Injection & Stats ===
+
+@app.before_request
+def inject_faults():
+    g.start = time.perf_counter()
+    if not request.path.startswith("/v3"):
+        return None
+    if settings["latency_ms"]:
+        time.sleep(random.uniform(0.5, 1.5) * settings["latency_ms"] / 1000)
+    if random.random() < settings["error_rate"]:
+        return _error(503, "SERVICE_UNAVAILABLE", "Injected failure")
+    return None
+
+@app.after_request
+def record_stats(response):
+    if request.path.startswith("/v3") and request.method == "POST" and response.status_code == 201:
+        # The order was processed, but the client never hears about it
+        if random.random() < settings["lost_response_rate"]:
+            response = app.make_response(_error(504, "GATEWAY_TIMEOUT", "Injected lost response"))
+    key = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+    elapsed_ms = (time.perf_counter() - g.start) * 1000
+    with _lock:
+        stats = _stats[key]
+        stats["count"] += 1
+        stats["errors"] += response.status_code >= 400
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+    return response
+
+# === OANDA Endpoints ===
+
+@app.get("/v3/instruments/<instrument>/candles")
+def candles(instrument):
+    granularity = request.args.get("granularity", "S5")
+    count = int(request.args.get("count", 500))
+    units = {"S": "s", "M": "min", "H": "h", "D": "D"}
+    step = pd.Timedelta(int(granularity[1:] or 1), units[granularity[0]])
+
+    with _lock:
+        try:
+            path = _path(instrument)
+        except KeyError:
+            return _error(400, "INVALID_INSTRUMENT", f"Unknown instrument {instrument}")
+        now = sim_now()
+
+    bars = path.resample(step, label="left", closed="left").agg(
+        {"o": "first", "h": "max", "l": "min", "c": "last", "volume": "sum"}
+    ).dropna()
+    if "from" in request.args:
+        start = pd.Timestamp(request.args["from"])
+        start = start.tz_localize("UTC") if start.tzinfo is None else start
+        include_first = request.args.get("includeFirst", "true") == "true"
+        bars = bars[bars.index >= start] if include_first else bars[bars.index > start]
+        bars = bars.head(count)
+    elif "to" in request.args:
+        end = pd.Timestamp(request.args["to"])
+        end = end.tz_localize("UTC") if end.tzinfo is None else end
+        bars = bars[bars.index < end].tail(count)
+    else:
+        bars = bars.tail(count)
+
+    return jsonify({"instrument": instrument, "granularity": granularity, "candles": [{
+        "time": _time(ts),
+        "complete": bool(ts + step <= now),
+        "volume": int(bar["volume"]),
+        "mid": {k: _fmt(instrument, bar[k]) for k in ("o", "h", "l", "c")}
+    } for ts, bar in bars.iterrows()]})
+
+@app.get("/v3/accounts/<account_id>/pricing")
+def pricing(account_id):
+    prices = []
+    currencies = set()
+    with _lock:
+        for instrument in request.args.get("instruments", "").split(","):
+            try:
+                bid, ask = _quote(instrument)
+                factor = f"{_home_rate(instrument.partition('_')[2]):.10g}"
+            except KeyError:
+                return _error(400, "INVALID_INSTRUMENT", f"Unknown instrument {instrument}")
+            currencies.update(instrument.split("_"))
+            prices.append({"instrument": instrument, "time": _time(sim_now()), "tradeable": True,
+                           "bids": [{"price": _fmt(instrument, bid), "liquidity": 10000000}],
+                           "asks": [{"price": _fmt(instrument, ask), "liquidity": 10000000}],
+                           "quoteHomeConversionFactors": {"positiveUnits": factor, "negativeUnits": factor}})
+        body = {"prices": prices}
+        if request.args.get("includeHomeConversions") == "true":
+            body["homeConversions"] = [
+                {"currency": c, "accountGain": f"{rate:.10g}", "accountLoss": f"{rate:.10g}", "positionValue": f"{rate:.10g}"}
+                for c, rate in ((c, _home_rate(c)) for c in sorted(currencies))
+            ]
+    return jsonify(body)
+
+@app.get("/v3/accounts/<account_id>/instruments")
+def instruments(account_id):
+    names = sorted(set(DEFAULT_INSTRUMENTS) | set(_paths))
+    return jsonify({"instruments": [{
+        "name": name, "type": "CURRENCY", "pipLocation": -2 if name.endswith("_JPY") else -4,
+        "displayPrecision": _precision(name), "marginRate": str(settings["margin_rate"])
+    } for name in names]})
+
+@app.get("/v3/accounts/<account_id>/summary")
+def summary(account_id):
+    with _lock:
+        _advance()
+        return jsonify({"account": {"id": account_id, **_account_summary()}})
+
+@app.get("/v3/accounts/<account_id>/openTrades")
+def open_trades(account_id):
+    with _lock:
+        _advance()
+        return jsonify({"trades": [_trade_json(t) for t in _trades.values()],
+                        "lastTransactionID": str(_account["last_id"])})
+
+@app.post("/v3/accounts/<account_id>/orders")
+def create_order(account_id):
+    order = dict(request.get_json(force=True)["order"])
+    if order.get("type") != "MARKET":
+        return _error(400, "UNSUPPORTED_ORDER_TYPE", "Only MARKET orders are simulated")
+
+    with _lock:
+        _advance()
+        client_id = order.get("clientExtensions", {}).get("id")
+        if client_id in _client_orders:
+            return _error(400, "CLIENT_ORDER_ID_ALREADY_EXISTS", f"Client order ID {client_id} already exists")
+        try:
+            _quote(order["instrument"])
+        except KeyError:
+            return _error(400, "INVALID_INSTRUMENT", f"Unknown instrument {order['instrument']}")
+
+        order["id"] = _next_id()
+        create = {**order, "id": order["id"], "type": "MARKET_ORDER"}
+        _transactions[order["id"]] = create
+        fill = _fill_market_order(order)
+        _orders[order["id"]] = {"id": order["id"], "state": "FILLED", "fillingTransactionID": fill["id"],
+                                "instrument": order["instrument"], "units": order["units"],
+                                "clientExtensions": order.get("clientExtensions")}
+        if client_id:
+            _client_orders[client_id] = order["id"]
+        return jsonify({"orderCreateTransaction": create, "orderFillTransaction": fill,
+                        "lastTransactionID": str(_account["last_id"])}), 201
+
+@app.get("/v3/accounts/<account_id>/orders/<specifier>")
+def get_order(account_id, specifier):
+    with _lock:
+        order_id = _client_orders.get(specifier[1:]) if specifier.startswith("@") else specifier
+        if order_id not in _orders:
+            return _error(404, "ORDER_DOESNT_EXIST", "The order specified does not exist")
+        return jsonify({"order": _orders[order_id]})
+
+@app.get("/v3/accounts/<account_id>/transactions/<transaction_id>")
+def get_transaction(account_id, transaction_id):
+    with _lock:
+        if transaction_id not in _transactions:
+            return _error(404, "TRANSACTION_DOESNT_EXIST", "The transaction specified does not exist")
+        return jsonify({"transaction": _transactions[transaction_id]})
+
+@app.put("/v3/accounts/<account_id>/positions/<instrument>/close")
+def close_position(account_id, instrument):
+    with _lock:
+        _advance()
+        bid, ask = _quote(instrument)
+        result = {}
+        for side, key, price in (("long", "longOrderFillTransaction", bid), ("short", "shortOrderFillTransaction", ask)):
+            trades = [t for t in _trades.values()
+                      if t["instrument"] == instrument and (t["units"] > 0) == (side == "long")]
+            if not trades:
+                continue
+            closed = [_close_units(t, t["units"], price, "MARKET_ORDER") for t in trades]
+            fill = {"id": _next_id(), "type": "ORDER_FILL", "instrument": instrument,
+                    "units": str(sum(int(c["units"]) for c in closed)), "price": _fmt(instrument, price),
+                    "tradesClosed": closed}
+            _transactions[fill["id"]] = fill
+            result[key] = fill
+        result["lastTransactionID"] = str(_account["last_id"])
+        return jsonify(result)
+
+# === Simulator Control ===
+
+@app.get("/sim/stats")
+def sim_stats():
+    with _lock:
+        endpoints = {
+            key: {**s, "avg_ms": round(s["total_ms"] / s["count"], 2) if s["count"] else 0.0}
+            for key, s in _stats.items()
+        }
+        return jsonify({"sim_time": _time(sim_now()), "settings": settings, "endpoints": endpoints,
+                        "open_trades": len(_trades), "account": _account_summary() if _paths else None})
+
+@app.get("/sim/clock")
+def sim_clock():
+    return jsonify({"time": sim_now().tz_localize(None).isoformat(), "speed": settings["speed"]})
+
+@app.post("/sim/config")
+def sim_config():
+    """Adjusts latency, error rates or speed while a test is running."""
+    updates = request.get_json(force=True)
+    with _lock:
+        if "speed" in updates:
+            # Re-anchor the clock so simulated time stays continuous
+            _clock.update({"sim": sim_now(), "wall": time.monotonic()})
+        settings.update({k: type(settings[k])(v) for k, v in updates.items() if k in settings})
+    return jsonify(settings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OANDA v20 simulator.")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--speed", type=float, default=1.0, help="Simulated seconds per real second")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean injected latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--lost-response-rate", type=float, default=0.0,
+                        help="Fraction of processed orders whose response is replaced with a 504")
+    parser.add_argument("--spread-pips", type=float, default=1.0)
+    parser.add_argument("--hedging", action="store_true", help="Simulate a hedging-enabled account")
+    parser.add_argument("--balance", type=float, default=10000.0)
+    parser.add_argument("--history-days", type=int, default=60, help="Price history available before the start")
+    parser.add_argument("--candles", help="Recorded OANDA candle JSON to replay instead of a random walk")
+    parser.add_argument("--instrument", default="GBP_USD", help="Instrument the recorded candles belong to")
+    parser.add_argument("--start", help="Simulated start time (UTC), e.g. 2025-03-03T06:00; defaults to now")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    global _rng
+    _rng = np.random.default_rng(args.seed)
+    random.seed(args.seed)
+    settings.update({
+        "speed": args.speed, "latency_ms": args.latency_ms, "error_rate": args.error_rate,
+        "lost_response_rate": args.lost_response_rate, "spread_pips": args.spread_pips,
+        "hedging": args.hedging,
+        "history_days": args.history_days
+    })
+    _account["balance"] = args.balance
+    if args.start:
+        _clock["sim"] = pd.Timestamp(args.start, tz="UTC").floor("min")
+    if args.candles:
+        load_recorded(args.instrument, args.candles)
+    _clock["wall"] = time.monotonic()
+
+    print(f"[SIM] OANDA simulator on :{args.port} at {args.speed}x from {_time(_clock['sim'])}")
+    app.run(host="127.0.0.1", port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# replay.py
+"""
+Batch replay of the live decision path over cached historical candles.
+
+Every bar in the range is scored in one predict_proba call and run through
+the same gating rules as main.predict_and_trade, producing trade and skip
+journals in the live CSV format for side-by-side comparison.
+
+By default features are computed once over the whole history, as in
+training. Live predictions only see the last 49 complete candles, so the
+recursive indicators (RSI, MACD, ATR, ADX) seeded from that short window
+differ: ADX can be several points off and RSI a point or two.
+Pass --exact to recompute each tradeable bar's features from its own live
+window, which matches live values at roughly 12 ms per bar.
+
+Usage: python replay.py --start 2025-01-01 --end 2025-04-01 [--exact]
+"""
+import argparse
+import json
+import logging
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+import config
+import log_config
+import broker
+import model
+import risk
+import trade_logger
+from utils import granularity_delta, market_open_mask, safe_trading_mask
+
+logger = logging.getLogger(__name__)
+
+TRADE_FIELDS = ["timestamp", "direction", "confidence", "indicators"]
+SKIPPED_FIELDS = ["timestamp", "direction", "confidence", "reason_skipped", "indicators"]
+
+# === History Cache ===
+
+WARMUP_CANDLES = 2 * model.LIVE_CANDLE_COUNT  # Live window plus settling time for the recursive indicators
+MAX_DATA_GAP = pd.Timedelta(hours=6)  # Open-market time without candles that counts as a hole in the cache
+
+def _cache_path(instrument, granularity):
+    return os.path.join(config.HISTORY_CACHE_DIR, f"{instrument}_{granularity}.json")
+
+def _open_time_between(after, before, bar):
+    """Market-open time in the bar slots after `after` and before `before`."""
+    if after + bar >= before:
+        return pd.Timedelta(0)
+    slots = pd.date_range(after + bar, before, freq=bar, inclusive="left")
+    return bar * int(np.asarray(market_open_mask(slots)).sum())
+
+def _covers(times, start_ts, end_ts, bar):
+    """True when the cache holds the warm-up candles before start and [start, end) without holes."""
+    first = times.searchsorted(start_ts)
+    if first < WARMUP_CANDLES:
+        return False
+    span = times[first - WARMUP_CANDLES:]
+    span = span[span < end_ts]
+    if _open_time_between(span[-1], end_ts, bar) > pd.Timedelta(0):
+        return False
+    gaps = np.flatnonzero(np.diff(span.asi8) > bar.value)
+    return all(_open_time_between(span[i], span[i + 1], bar) <= MAX_DATA_GAP for i in gaps)
+
+def load_history(instrument, granularity, start, end):
+    """
+    Returns the WARMUP_CANDLES complete candles before start followed by those in [start, end).
+    The warm-up is counted in candles so weekends do not shorten it. Fetches only when the cache falls short.
+    """
+    path = _cache_path(instrument, granularity)
+    cached = []
+    if os.path.exists(path):
+        with open(path) as f:
+            cached = json.load(f)
+
+    start_ts, end_ts = pd.Timestamp(start, tz="UTC"), pd.Timestamp(end, tz="UTC")
+    bar = granularity_delta(granularity)
+    times = pd.DatetimeIndex(pd.to_datetime([c["time"] for c in cached], utc=True))
+    if not cached or not _covers(times, start_ts, end_ts, bar):
+        logger.info("Fetching candles", extra={"instrument": instrument, "granularity": granularity,
+                                               "from": start_ts, "to": end_ts, "warmup": WARMUP_CANDLES})
+        start_str, end_str = start_ts.strftime("%Y-%m-%dT%H:%M:%SZ"), end_ts.strftime("%Y-%m-%dT%H:%M:%SZ")
+        fetched = broker.get_candles(instrument, WARMUP_CANDLES + 1, granularity, to=start_str)
+        fetched += broker.get_candles_range(instrument, granularity, start_str, end_str)
+        merged = {c["time"]: c for c in cached}
+        merged.update({c["time"]: c for c in fetched if c.get("complete", False)})
+        cached = [merged[t] for t in sorted(merged)]
+        os.makedirs(config.HISTORY_CACHE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(cached, f)
+        times = pd.DatetimeIndex(pd.to_datetime([c["time"] for c in cached], utc=True))
+
+    first, last = times.searchsorted(start_ts), times.searchsorted(end_ts)
+    return cached[max(first - WARMUP_CANDLES, 0):last]
+
+# === Replay ===
+
+def _exit_index(highs, lows, entry, i, direction, tp, sl):
+    """Index of the bar where the bracket order opened at bar i is closed, or len(highs)."""
+    up = highs[i + 1:] - entry
+    down = entry - lows[i + 1:]
+    favourable, adverse = (up, down) if direction == 1 else (down, up)
+    hit = (favourable >= tp) | (adverse >= sl)
+    return i + 1 + int(hit.argmax()) if hit.any() else len(highs)
+
+def _live_window_features(candles, bar_times):
+    """Features for each bar computed only from the complete candles a live prediction would see."""
+    window = model.LIVE_CANDLE_COUNT - 1
+    complete = [c for c in candles if c.get("complete", False)]
+    position = {pd.Timestamp(c["time"]): i for i, c in enumerate(complete)}
+    rows = []
+    for t in bar_times:
+        end = position[t] + 1
+        rows.append(model.preprocess_candles(complete[max(end - window, 0):end]).iloc[-1])
+    return pd.DataFrame(rows, index=bar_times)[model.FEATURES]
+
+def replay(start, end, instrument=config.TRADING_INSTRUMENT, granularity=config.TIMEFRAME, exact=False):
+    """
+    Scores every bar in [start, end) and applies the live gating rules.
+    With exact=True, bars that pass gating get features from their own live window
+    instead of the whole history. Pause state and account risk limits are not replayed.
+    Returns (trades, skipped).
+    """
+    candles = load_history(instrument, granularity, start, end)
+    # Live predictions only see LIVE_CANDLE_COUNT candles, minus the incomplete one
+    df = model.preprocess_candles(candles, vwap_window=model.LIVE_CANDLE_COUNT - 1)
+    bar_times = pd.to_datetime(df.index, utc=True)
+    df = df[bar_times >= pd.Timestamp(start, tz="UTC")]
+    bar_times = bar_times[bar_times >= pd.Timestamp(start, tz="UTC")]
+    if df.empty:
+        return [], []
+
+    # Live decisions are made once a bar has closed
+    decision_times = bar_times + granularity_delta(granularity)
+    timestamps = [t.isoformat() for t in decision_times.tz_localize(None)]
+    market_open = np.asarray(market_open_mask(decision_times))
+    safe_time = np.asarray(safe_trading_mask(decision_times))
+
+    X = df[model.FEATURES].copy()
+    if exact:
+        tradeable = market_open & safe_time
+        X.loc[tradeable] = _live_window_features(candles, bar_times[tradeable]).values
+
+    clf = model.load_model()
+    proba = clf.predict_proba(X)
+    confidence = proba.max(axis=1)
+    direction = clf.classes_[proba.argmax(axis=1)].astype(int)
+    indicators = X.to_dict("records")
+    confident = confidence >= config.CONFIDENCE_THRESHOLD
+
+    highs, lows, closes = df["high"].values, df["low"].values, df["close"].values
+    tp = model.TP_PIPS * risk.pip_size(instrument)
+    sl = model.SL_PIPS * risk.pip_size(instrument)
+
+    trades, skipped = [], []
+    held_direction, held_until = None, -1
+    for i in range(len(df)):
+        if not market_open[i] or not safe_time[i]:
+            reason = trade_logger.SKIP_MARKET_CLOSED if not market_open[i] else trade_logger.SKIP_VOLATILE_HOUR
+            skipped.append({"timestamp": timestamps[i], "direction": None, "confidence": None,
+                            "reason_skipped": reason, "indicators": {}})
+            continue
+
+        d, conf = int(direction[i]), float(confidence[i])
+        if not confident[i]:
+            reason = trade_logger.low_confidence_reason(conf)
+        elif held_direction == d and i < held_until:
+            reason = trade_logger.already_holding_reason(d)
+        else:
+            trades.append({"timestamp": timestamps[i], "direction": d, "confidence": conf,
+                           "indicators": indicators[i]})
+            held_direction = d
+            held_until = _exit_index(highs, lows, closes[i], i, d, tp, sl)
+            continue
+
+        skipped.append({"timestamp": timestamps[i], "direction": d, "confidence": conf,
+                        "reason_skipped": reason, "indicators": indicators[i]})
+
+    return trades, skipped
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the live decision path over historical candles.")
+    parser.add_argument("--start", required=True, help="Start date/time (UTC), e.g. 2025-01-01")
+    parser.add_argument("--end", required=True, help="End date/time (UTC), exclusive")
+    parser.add_argument("--instrument", default=config.TRADING_INSTRUMENT)
+    parser.add_argument("--granularity", default=config.TIMEFRAME)
+    parser.add_argument("--out-dir", default="replay")
+    parser.add_argument("--exact", action="store_true", help="Compute features per live candle window (slower)")
+    args = parser.parse_args()
+
+    log_config.setup()
+    trades, skipped = replay(args.start, args.end, args.instrument, args.granularity, args.exact)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    trade_logger.write_rows(os.path.join(args.out_dir, trade_logger.TRADE_LOG_FILE), trades, TRADE_FIELDS)
+    trade_logger.write_rows(os.path.join(args.out_dir, trade_logger.SKIPPED_TRADE_LOG_FILE), skipped, SKIPPED_FIELDS)
+
+    print(f"[REPLAY] {len(trades) + len(skipped)} bars: {len(trades)} trades, {len(skipped)} skipped")
+    for reason, count in Counter(
+        r["reason_skipped"] if not r["reason_skipped"].startswith("⚠️") else "⚠️ Low confidence"
+        for r in skipped
+    ).most_common():
+        print(f"  {reason}: {count}")
+    log_config.shutdown()
+
+if __name__ == "__main__":
+    main()
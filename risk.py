@@ -0,0 +1,230 @@
+# risk.py
+"""
+In-memory risk state: instrument metadata, account snapshot and net positions.
+
+Metadata is fetched from OANDA once and cached. The account snapshot and
+positions are refreshed once per cycle and then updated incrementally on
+fills, so sizing and limit checks never make their own API calls.
+"""
+import logging
+import threading
+import config
+import broker
+
+logger = logging.getLogger(__name__)
+_lock = threading.Lock()
+_instruments = {}
+_account = {"nav": 0.0, "margin_used": 0.0, "margin_available": 0.0, "currency": "GBP"}
+_positions = {}  # instrument -> {"units": float, "price": float}
+_conversions = {}  # currency -> account-currency value of one unit, from pricing
+
+# === Instrument Metadata ===
+
+def _default_meta(instrument):
+    base, _, quote = instrument.partition("_")
+    pip_location = -2 if quote == "JPY" else -4
+    return {
+        "pip_size": 10 ** pip_location,
+        "precision": 3 if quote == "JPY" else 5,
+        "margin_rate": 1 / config.MAX_LEVERAGE,
+        "base": base,
+        "quote": quote
+    }
+
+def load_instruments(force=False):
+    """Fetches pip size, precision and margin rate for all account instruments once."""
+    if _instruments and not force:
+        return _instruments
+    try:
+        fetched = {}
+        for inst in broker.get_instruments():
+            base, _, quote = inst["name"].partition("_")
+            fetched[inst["name"]] = {
+                "pip_size": 10 ** int(inst["pipLocation"]),
+                "precision": int(inst["displayPrecision"]),
+                "margin_rate": float(inst["marginRate"]),
+                "base": base,
+                "quote": quote
+            }
+        with _lock:
+            _instruments.clear()
+            _instruments.update(fetched)
+    except Exception as e:
+        logger.warning("Instrument metadata fetch failed, using defaults", extra={"error": str(e)})
+    return _instruments
+
+def instrument_meta(instrument):
+    meta = _instruments.get(instrument)
+    if meta is None:
+        meta = load_instruments().get(instrument)
+    if meta is None:
+        meta = _default_meta(instrument)
+        with _lock:
+            _instruments[instrument] = meta
+    return meta
+
+def pip_size(instrument):
+    return instrument_meta(instrument)["pip_size"]
+
+def price_precision(instrument):
+    return instrument_meta(instrument)["precision"]
+
+def format_price(instrument, price):
+    return f"{price:.{price_precision(instrument)}f}"
+
+# === Account & Positions ===
+
+def refresh_account():
+    """Refreshes NAV and margin figures with a single account summary call."""
+    account = broker.get_account_summary()
+    with _lock:
+        _account.update({
+            "nav": float(account["NAV"]),
+            "margin_used": float(account["marginUsed"]),
+            "margin_available": float(account["marginAvailable"]),
+            "currency": account.get("currency", _account["currency"])
+        })
+    return dict(_account)
+
+def account_nav():
+    return _account["nav"]
+
+def sync_positions(open_trades):
+    """Rebuilds net positions from the openTrades response already fetched by the caller."""
+    positions = {}
+    for trade in open_trades:
+        units = float(trade.get("currentUnits", 0))
+        price = float(trade.get("price", 0))
+        pos = positions.setdefault(trade["instrument"], {"units": 0.0, "price": 0.0})
+        total = abs(pos["units"]) + abs(units)
+        if total:
+            pos["price"] = (pos["price"] * abs(pos["units"]) + price * abs(units)) / total
+        pos["units"] += units
+    with _lock:
+        _positions.clear()
+        _positions.update(positions)
+
+def apply_fill(instrument, units, price):
+    """Applies a fill to the net position for the instrument."""
+    with _lock:
+        pos = _positions.get(instrument, {"units": 0.0, "price": 0.0})
+        new_units = pos["units"] + units
+        if new_units == 0:
+            _positions.pop(instrument, None)
+            return
+        if pos["units"] * units > 0:
+            total = abs(pos["units"]) + abs(units)
+            avg_price = (pos["price"] * abs(pos["units"]) + price * abs(units)) / total
+        elif abs(units) > abs(pos["units"]):
+            avg_price = price  # Position flipped, remainder opened at fill price
+        else:
+            avg_price = pos["price"]
+        _positions[instrument] = {"units": new_units, "price": avg_price}
+
+def apply_close(instrument):
+    with _lock:
+        _positions.pop(instrument, None)
+
+def net_units(instrument):
+    return _positions.get(instrument, {"units": 0.0})["units"]
+
+# === Exposure & Sizing ===
+
+def set_home_conversions(factors):
+    """Caches quote-to-account-currency factors (currency -> factor) reported by the pricing endpoint."""
+    with _lock:
+        _conversions.update({currency: float(factor) for currency, factor in factors.items()})
+
+def _quote_to_home(instrument, price):
+    """
+    Conversion factor from the instrument's quote currency to the account currency,
+    or None when it cannot be derived from the instrument or cached pricing.
+    """
+    meta = instrument_meta(instrument)
+    home = _account["currency"]
+    if meta["quote"] == home:
+        return 1.0
+    if meta["quote"] in _conversions:
+        return _conversions[meta["quote"]]
+    if meta["base"] == home and price:
+        return 1 / price
+    return None
+
+def _notional(instrument, units, price):
+    conversion = _quote_to_home(instrument, price)
+    return None if conversion is None else abs(units) * price * conversion
+
+def exposure():
+    """
+    Returns per-instrument notional and margin in account currency, plus totals.
+    Positions with no known conversion are listed under "unconverted" and left out of the totals.
+    """
+    positions = dict(_positions)
+    by_instrument = {}
+    unconverted = []
+    for instrument, pos in positions.items():
+        notional = _notional(instrument, pos["units"], pos["price"])
+        if notional is None:
+            unconverted.append(instrument)
+            continue
+        by_instrument[instrument] = {
+            "units": pos["units"],
+            "notional": notional,
+            "margin": notional * instrument_meta(instrument)["margin_rate"]
+        }
+    total_notional = sum(p["notional"] for p in by_instrument.values())
+    total_margin = sum(p["margin"] for p in by_instrument.values())
+    nav = _account["nav"]
+    return {
+        "instruments": by_instrument,
+        "notional": total_notional,
+        "margin": total_margin,
+        "unconverted": unconverted,
+        "leverage": total_notional / nav if nav else 0.0,
+        "margin_usage": total_margin / nav if nav else 0.0
+    }
+
+def position_size(instrument, price, sl_pips=config.SL_PIPS, nav=None, risk_percent=config.RISK_PER_TRADE):
+    """Units such that hitting the stop loss loses risk_percent of NAV."""
+    nav = _account["nav"] if nav is None else nav
+    conversion = _quote_to_home(instrument, price)
+    if conversion is None:
+        logger.warning("No account-currency conversion, refusing to size",
+                       extra={"instrument": instrument, "currency": _account["currency"]})
+        return 0
+    loss_per_unit = sl_pips * pip_size(instrument) * conversion
+    if nav <= 0 or loss_per_unit <= 0:
+        return 0
+    return int(nav * risk_percent / loss_per_unit)
+
+def check_trade(instrument, target_units, price):
+    """
+    Pre-trade limit check for moving the instrument's net position to target_units.
+    Returns (ok, reason).
+    """
+    if target_units == 0:
+        return False, "Position size is zero"
+
+    nav = _account["nav"]
+    if nav <= 0:
+        return False, "Account NAV unavailable"
+
+    current = exposure()
+    notional = _notional(instrument, target_units, price)
+    unconverted = [i for i in current["unconverted"] if i != instrument] + ([instrument] if notional is None else [])
+    if unconverted:
+        # Limits cannot be checked against positions of unknown size in account currency
+        return False, f"No {_account['currency']} conversion for {', '.join(unconverted)}"
+
+    existing = current["instruments"].get(instrument, {"notional": 0.0, "margin": 0.0})
+    margin = notional * instrument_meta(instrument)["margin_rate"]
+
+    leverage = (current["notional"] - existing["notional"] + notional) / nav
+    if leverage > config.MAX_LEVERAGE:
+        return False, f"Leverage {leverage:.1f}x exceeds {config.MAX_LEVERAGE}x"
+
+    margin_usage = (current["margin"] - existing["margin"] + margin) / nav
+    if margin_usage > config.MAX_MARGIN_USAGE:
+        return False, f"Margin usage {margin_usage:.0%} exceeds {config.MAX_MARGIN_USAGE:.0%}"
+
+    return True, None
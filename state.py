@@ -0,0 +1,114 @@
+# state.py
+"""
+Runtime state shared by the scheduler, Flask and Telegram threads.
+
+Reads are plain dict lookups with no locking or I/O. Writes swap values in
+under a lock and are persisted to SQLite by a background writer, so state
+survives restarts without putting disk I/O on the trading path. Treat
+returned values as read-only; store a new value to change one.
+"""
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+import config
+
+logger = logging.getLogger(__name__)
+
+_data = {}
+_write_lock = threading.Lock()
+_pending = queue.Queue()
+_writer = None
+
+# === Encoding ===
+
+def _default(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    return str(value)
+
+def _object_hook(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+def _encode(value):
+    return json.dumps(value, default=_default)
+
+def _decode(raw):
+    return json.loads(raw, object_hook=_object_hook)
+
+# === Persistence ===
+
+def _connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    return conn
+
+def _write_loop(path, pending):
+    conn = _connect(path)
+    while True:
+        item = pending.get()
+        batch = {}
+        waiters = []
+        # Coalesce everything queued so far into one transaction
+        while True:
+            if isinstance(item, tuple):
+                batch[item[0]] = item[1]
+            else:
+                waiters.append(item)
+            try:
+                item = pending.get_nowait()
+            except queue.Empty:
+                break
+        if batch:
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", batch.items())
+            except sqlite3.Error:
+                logger.exception("State write failed", extra={"keys": list(batch)})
+        for waiter in waiters:
+            waiter.set()
+
+def load(path=config.STATE_PATH):
+    """Loads persisted state into memory and starts the background writer."""
+    global _writer
+    conn = _connect(path)
+    try:
+        rows = conn.execute("SELECT key, value FROM state").fetchall()
+    finally:
+        conn.close()
+    with _write_lock:
+        _data.update({key: _decode(value) for key, value in rows})
+
+    if _writer is None:
+        _writer = threading.Thread(target=_write_loop, args=(path, _pending), name="state-writer", daemon=True)
+        _writer.start()
+
+def flush(timeout=5):
+    """Blocks until queued writes are on disk."""
+    if _writer is None:
+        return
+    done = threading.Event()
+    _pending.put(done)
+    done.wait(timeout)
+
+atexit.register(flush)
+
+# === Access ===
+
+def get(key, default=None):
+    return _data.get(key, default)
+
+def set(key, value):
+    with _write_lock:
+        _data[key] = value
+        _pending.put((key, _encode(value)))
+
+load()
@@ -1,27 +1,36 @@
 # telegram_bot.py
 import config
 import logging
+import queue
+import threading
+from collections import deque
 from telegram import Update, Bot
-from telegram.ext import Updater, CommandHandler, CallbackContext
-from datetime import datetime
+from telegram.ext import Updater, Dispatcher, CommandHandler, CallbackContext
 from utils import is_market_open, format_gbp, get_equity
 from broker import get_open_trades, get_current_price, calculate_dynamic_units
 from trade_logger import get_trade_summary
+import risk
+import execution
+import monitor
+import state
 from model import retrain_model, backtest_model
 
-# === State Tracking ===
-TRADING_PAUSED = False
-last_prediction = {
-    "direction": None,
-    "confidence": None,
-    "indicators": {},
-    "timestamp": None
-}
-last_retrain_time = None
-
 # Logging & Bot Init
-logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
-bot = Bot(token=config.TELEGRAM_TOKEN)
+logger = logging.getLogger(__name__)
+bot = Bot(token=config.TELEGRAM_TOKEN, base_url=config.TELEGRAM_API_URL)
+
+# === Webhook Ingestion State ===
+WEBHOOK_QUEUED = "queued"
+WEBHOOK_DUPLICATE = "duplicate"
+WEBHOOK_BUSY = "busy"
+WEBHOOK_INVALID = "invalid"
+
+dispatcher = None
+update_queue = queue.Queue(maxsize=config.WEBHOOK_QUEUE_SIZE)
+webhook_stats = {"queued": 0, "duplicates": 0, "rejected": 0, "invalid": 0, "processed": 0, "failed": 0}
+_seen_update_ids = deque(maxlen=config.WEBHOOK_DEDUP_SIZE)
+_seen_lookup = set()
+_webhook_lock = threading.Lock()
 
 # === Command Handlers ===
 
@@ -29,7 +38,8 @@ def start(update: Update, context: CallbackContext):
     update.message.reply_text("👋 Bot is online and ready.")
 
 def status(update: Update, context: CallbackContext):
-    global last_prediction, last_retrain_time
+    last_prediction = state.get("last_prediction", {})
+    last_retrain_time = state.get("last_retrain_time")
     direction = last_prediction.get("direction")
     confidence = last_prediction.get("confidence")
     timestamp = last_prediction.get("timestamp")
@@ -46,16 +56,17 @@ def status(update: Update, context: CallbackContext):
 
     if confidence is not None:
         conf_str = f"{confidence:.2f}"
-        conf_status = "✅ trade triggered" if confidence >= 0.6 else "🔻 below threshold"
+        conf_status = "✅ trade triggered" if confidence >= config.CONFIDENCE_THRESHOLD else "🔻 below threshold"
     else:
         conf_str = "N/A"
         conf_status = "N/A"
 
     pred_time = timestamp.strftime('%Y-%m-%d %H:%M:%S UTC') if timestamp else "Never"
-    paused_str = "⏸️ Paused" if TRADING_PAUSED else "▶️ Active"
+    paused_str = "⏸️ Paused" if state.get("trading_paused", config.TRADING_PAUSED) else "▶️ Active"
     market_str = "🟢 Yes" if is_market_open() else "🔴 No"
 
     open_trades = get_open_trades()
+    risk.sync_positions(open_trades)
     trade_count = len(open_trades)
     total_value = sum(abs(float(t["currentUnits"])) for t in open_trades)
     total_gbp = format_gbp(total_value)
@@ -68,6 +79,21 @@ def status(update: Update, context: CallbackContext):
     except Exception as e:
         units_str = f"Error: {e}"
 
+    exposure = risk.exposure()
+    exposure_str = f"{exposure['leverage']:.1f}x NAV, margin {exposure['margin_usage']:.0%}"
+    backend = state.get("model_backend")
+    backend_str = f"{backend['backend']} ({backend['latency_ms']} ms/prediction)" if backend else "N/A"
+    health = monitor.summary()
+    if health["active"]:
+        calibration = health["calibration"]
+        gap_str = f"{calibration['gap']:+.2f}" if calibration["gap"] is not None else "N/A"
+        drift_str = (f"PSI {health['max_psi']:.2f}/{health['psi_limit']:.2f} ({health['worst_feature'] or 'N/A'}), "
+                     f"calibration gap {gap_str}")
+    else:
+        drift_str = "No training statistics"
+    fills = execution.latency_summary()
+    fill_str = f"{fills['avg_latency_ms']} ms avg, {fills['avg_slippage_pips']} pips slippage ({fills['fills']} fills)"
+
     msg = (
         f"📊 *Bot Status*\n\n"
         f"🔄 *Bot:* {paused_str}\n"
@@ -75,7 +101,11 @@ def status(update: Update, context: CallbackContext):
         f"📈 *Open Trades:* {trade_count}\n"
         f"💷 *Total Position:* {total_gbp}\n"
         f"📐 *Next Trade Size:* {units_str}\n"
-        f"🧠 *Last Retrain:* {retrain_str}\n\n"
+        f"📏 *Exposure:* {exposure_str}\n"
+        f"⚡ *Execution:* {fill_str}\n"
+        f"🧠 *Last Retrain:* {retrain_str}\n"
+        f"🧩 *Model Backend:* {backend_str}\n"
+        f"🧭 *Model Health:* {drift_str}\n\n"
         f"🤖 *Last Prediction:* {dir_str}\n"
         f"📊 *Confidence:* {conf_str} ({conf_status})\n"
         f"⏱️ *At:* {pred_time}"
@@ -112,20 +142,16 @@ def trades(update: Update, context: CallbackContext):
         update.message.reply_text("Trade log not found.")
 
 def pause(update: Update, context: CallbackContext):
-    global TRADING_PAUSED
-    TRADING_PAUSED = True
+    state.set("trading_paused", True)
     update.message.reply_text("⏸️ Trading paused.")
 
 def resume(update: Update, context: CallbackContext):
-    global TRADING_PAUSED
-    TRADING_PAUSED = False
+    state.set("trading_paused", False)
     update.message.reply_text("▶️ Trading resumed.")
 
 def retrain(update: Update, context: CallbackContext):
-    global last_retrain_time
     try:
         retrain_model()
-        last_retrain_time = datetime.utcnow()
         update.message.reply_text("🧠 Model retrained.")
     except Exception as e:
         update.message.reply_text(f"❌ Retrain failed: {e}")
@@ -135,6 +161,7 @@ def backtest(update: Update, context: CallbackContext):
         result = backtest_model()
         msg = (
             f"🔁 *Backtest Results*\n\n"
+            f"🧩 *Backend:* {result['backend']}\n"
             f"📦 *Samples:* {result['samples']}\n"
             f"🎯 *Train Accuracy:* {result['train_accuracy']}%\n"
             f"✅ *Test Accuracy:* {result['test_accuracy']}%\n"
@@ -151,7 +178,7 @@ def send_text(msg):
     try:
         bot.send_message(chat_id=config.TELEGRAM_CHAT_ID, text=msg, parse_mode="Markdown")
     except Exception as e:
-        print(f"[Telegram] Send failed: {e}")
+        logger.warning("Send failed", extra={"error": str(e)})
 
 def send_trade_alert(direction, confidence, signal_type, units):
     emoji = "🟢 Buy" if direction == 1 else "🔴 Sell"
@@ -171,12 +198,9 @@ def send_prediction_alert(direction, confidence):
     )
     send_text(msg)
 
-# === Polling Setup ===
-
-def start_polling():
-    updater = Updater(token=config.TELEGRAM_TOKEN, use_context=True)
-    dp = updater.dispatcher
+# === Handler Registration ===
 
+def register_handlers(dp):
     dp.add_handler(CommandHandler("start", start))
     dp.add_handler(CommandHandler("status", status))
     dp.add_handler(CommandHandler("stats", stats))
@@ -186,31 +210,87 @@ def start_polling():
     dp.add_handler(CommandHandler("retrain", retrain))
     dp.add_handler(CommandHandler("backtest", backtest))
 
+# === Polling Setup ===
+
+def start_polling():
+    updater = Updater(token=config.TELEGRAM_TOKEN, base_url=config.TELEGRAM_API_URL, use_context=True)
+    register_handlers(updater.dispatcher)
+
     updater.start_polling()
     updater.idle()
 
 # === Webhook Setup ===
 
+def _remember_update_id(update_id):
+    """Record an update_id, returning False if it was already seen recently."""
+    with _webhook_lock:
+        if update_id in _seen_lookup:
+            return False
+        if len(_seen_update_ids) == _seen_update_ids.maxlen:
+            _seen_lookup.discard(_seen_update_ids[0])
+        _seen_update_ids.append(update_id)
+        _seen_lookup.add(update_id)
+        return True
+
+def _forget_update_id(update_id):
+    with _webhook_lock:
+        if update_id in _seen_lookup:
+            _seen_lookup.discard(update_id)
+            _seen_update_ids.remove(update_id)
+
+def _count(stat):
+    with _webhook_lock:
+        webhook_stats[stat] += 1
+
+def handle_webhook(payload):
+    """
+    Queues a raw Telegram update for the worker pool without processing it.
+    Returns WEBHOOK_QUEUED, WEBHOOK_DUPLICATE, WEBHOOK_BUSY when the queue is full,
+    or WEBHOOK_INVALID when the body is not a JSON object.
+    """
+    if not isinstance(payload, dict):
+        _count("invalid")
+        return WEBHOOK_INVALID
+
+    update_id = payload.get("update_id")
+    if update_id is not None and not _remember_update_id(update_id):
+        _count("duplicates")
+        return WEBHOOK_DUPLICATE
+
+    try:
+        update_queue.put_nowait(payload)
+    except queue.Full:
+        # Let Telegram redeliver it later instead of blocking the request thread
+        if update_id is not None:
+            _forget_update_id(update_id)
+        _count("rejected")
+        return WEBHOOK_BUSY
+
+    _count("queued")
+    return WEBHOOK_QUEUED
+
+def _webhook_worker():
+    while True:
+        payload = update_queue.get()
+        try:
+            dispatcher.process_update(Update.de_json(payload, bot))
+            _count("processed")
+        except Exception:
+            _count("failed")
+            logger.exception("Update failed", extra={"update_id": payload.get("update_id")})
+        finally:
+            update_queue.task_done()
+
 def setup_webhook():
-    from telegram.ext import Dispatcher
-    from flask import Flask, request
-
-    app = Flask(__name__)
-    updater = Updater(token=config.TELEGRAM_TOKEN, use_context=True)
-    dispatcher = updater.dispatcher
-
-    dispatcher.add_handler(CommandHandler("start", start))
-    dispatcher.add_handler(CommandHandler("status", status))
-    dispatcher.add_handler(CommandHandler("stats", stats))
-    dispatcher.add_handler(CommandHandler("trades", trades))
-    dispatcher.add_handler(CommandHandler("pause", pause))
-    dispatcher.add_handler(CommandHandler("resume", resume))
-    dispatcher.add_handler(CommandHandler("retrain", retrain))
-    dispatcher.add_handler(CommandHandler("backtest", backtest))
-
-    @app.route(f"/webhook/{config.TELEGRAM_TOKEN}", methods=["POST"])
-    def webhook():
-        dispatcher.process_update(Update.de_json(request.get_json(force=True), bot))
-        return "ok"
-
-    app.run(host="0.0.0.0", port=config.PORT)
\ No newline at end of file
+    """
+    Builds the dispatcher, starts the worker pool and registers the webhook URL.
+    Updates arrive through the Flask route in main.py, which calls handle_webhook().
+    """
+    global dispatcher
+    dispatcher = Dispatcher(bot, None, workers=0, use_context=True)
+    register_handlers(dispatcher)
+
+    for i in range(config.WEBHOOK_WORKERS):
+        threading.Thread(target=_webhook_worker, name=f"webhook-worker-{i}", daemon=True).start()
+
+    bot.set_webhook(url=config.WEBHOOK_URL)
@@ -0,0 +1,141 @@
+# telegram_sim.py
+"""
+Local Telegram Bot API stand-in and webhook load generator.
+
+Serves the Bot API methods the bot calls (getMe, setWebhook, deleteWebhook,
+sendMessage) and records every message sent, so the bot can run offline
+against it. With --burst it instead fires that many command updates at the
+bot's webhook route, including redeliveries, and reports the responses.
+
+Usage:
+    python telegram_sim.py --port 8082
+    TELEGRAM_TOKEN=123:abc TELEGRAM_API_URL=http://127.0.0.1:8082/bot python main.py
+    python telegram_sim.py --burst 500 --webhook http://127.0.0.1:8080/webhook/123:abc
+
+Sent messages and call counts are served at /sim/messages and /sim/stats.
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from flask import Flask, request, jsonify
+
+app = Flask(__name__)
+
+CHAT_ID = 1
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Forex Bot", "username": "forex_sim_bot"}
+
+_lock = threading.Lock()
+_messages = []
+_calls = Counter()
+_webhook = {"url": ""}
+
+# === Bot API ===
+
+def _params():
+    return {**request.args.to_dict(), **request.form.to_dict(), **(request.get_json(silent=True) or {})}
+
+def _ok(result):
+    return jsonify({"ok": True, "result": result})
+
+@app.route("/bot<token>/<method>", methods=["GET", "POST"])
+def bot_api(token, method):
+    params = _params()
+    with _lock:
+        _calls[method] += 1
+
+    if method == "getMe":
+        return _ok(BOT_USER)
+    if method == "setWebhook":
+        _webhook["url"] = params.get("url", "")
+        return _ok(True)
+    if method == "deleteWebhook":
+        _webhook["url"] = ""
+        return _ok(True)
+    if method == "sendMessage":
+        with _lock:
+            message = {
+                "message_id": len(_messages) + 1,
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", CHAT_ID)), "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", "")
+            }
+            _messages.append(message)
+        return _ok(message)
+    return jsonify({"ok": False, "error_code": 404, "description": f"Method {method} not found"}), 404
+
+@app.get("/sim/messages")
+def sim_messages():
+    with _lock:
+        return jsonify(_messages[-100:])
+
+@app.get("/sim/stats")
+def sim_stats():
+    with _lock:
+        return jsonify({"calls": dict(_calls), "messages": len(_messages), "webhook": _webhook["url"]})
+
+# === Webhook Load ===
+
+def command_update(update_id, command="/status"):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": CHAT_ID, "type": "private"},
+            "from": {"id": CHAT_ID, "is_bot": False, "first_name": "Sim"},
+            "text": command,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        }
+    }
+
+def burst(webhook_url, count, command="/status", duplicate_rate=0.1, concurrency=20):
+    """Posts `count` updates (plus redeliveries) concurrently and returns status code counts and latencies."""
+    updates = [command_update(i, command) for i in range(1, count + 1)]
+    updates += updates[:int(count * duplicate_rate)]
+
+    def post(update):
+        start = time.perf_counter()
+        try:
+            status = requests.post(webhook_url, json=update, timeout=10).status_code
+        except requests.RequestException:
+            status = "error"
+        return status, (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(post, updates))
+
+    latencies = sorted(ms for _, ms in results)
+    return {
+        "requests": len(results),
+        "status": dict(Counter(status for status, _ in results)),
+        "p50_ms": round(latencies[len(latencies) // 2], 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 1),
+        "max_ms": round(latencies[-1], 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Telegram Bot API stand-in and webhook load generator.")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--burst", type=int, help="Post this many updates to --webhook instead of serving")
+    parser.add_argument("--webhook", help="Bot webhook URL, e.g. http://127.0.0.1:8080/webhook/<token>")
+    parser.add_argument("--command", default="/status")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1, help="Fraction of updates redelivered")
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.burst:
+        if not args.webhook:
+            parser.error("--burst requires --webhook")
+        print(f"[SIM] {burst(args.webhook, args.burst, args.command, args.duplicate_rate, args.concurrency)}")
+        return
+
+    print(f"[SIM] Telegram Bot API on :{args.port}")
+    app.run(host="127.0.0.1", port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    main()
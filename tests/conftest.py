@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Bot modules read these at import; state.py opens its database in the cwd
+os.environ.setdefault("TELEGRAM_TOKEN", "123:abc")
+os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+os.chdir(tempfile.mkdtemp(prefix="forex-bot-tests-"))
+
+@pytest.fixture
+def serve():
+    """Runs a Flask app on a free local port and returns its base URL."""
+    servers = []
+
+    def start(app):
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
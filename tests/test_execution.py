@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+import broker
+import config
+import execution
+import oanda_sim
+import risk
+
+INSTRUMENT = "GBP_USD"
+
+def _sim_units():
+    return sum(t["units"] for t in oanda_sim._trades.values() if t["instrument"] == INSTRUMENT)
+
+@pytest.fixture
+def sim(serve, monkeypatch):
+    monkeypatch.setattr(broker, "OANDA_API_URL", f"{serve(oanda_sim.app)}/v3")
+    monkeypatch.setattr(config, "ORDER_RETRIES", 30)
+    monkeypatch.setattr(config, "ORDER_RETRY_DELAY", 0)
+    monkeypatch.setattr(risk, "_positions", {})
+    risk.load_instruments(force=True)
+    risk.sync_positions(broker.get_open_trades())
+    return oanda_sim
+
+def test_lost_responses_and_errors_never_duplicate_orders(sim, monkeypatch):
+    monkeypatch.setitem(sim.settings, "error_rate", 0.3)
+    monkeypatch.setitem(sim.settings, "lost_response_rate", 0.3)
+    random.seed(7)
+
+    orders_before = len(sim._orders)
+    targets = [1000, -2000, 500, 3000, -1500, 2500, -500, 1000]
+    for target in targets:
+        price = sim._mid(INSTRUMENT)
+        record = execution.execute_signal(INSTRUMENT, target, price, signal_time=0)
+        assert record["units"] != 0
+        assert risk.net_units(INSTRUMENT) == target
+        assert _sim_units() == target
+
+    # One order per signal despite resends
+    assert len(sim._orders) - orders_before == len(targets)
+    assert sim._stats["GET /v3/accounts/<account_id>/orders/<specifier>"]["errors"] > 0
+
+def test_lookup_errors_resend_under_same_client_id(sim, monkeypatch):
+    calls = []
+    real_get_order = broker.get_order
+
+    def flaky_get_order(spec):
+        calls.append(spec)
+        if len(calls) == 1:
+            raise broker.requests.ConnectionError("lookup dropped")
+        return real_get_order(spec)
+
+    monkeypatch.setattr(broker, "get_order", flaky_get_order)
+    monkeypatch.setitem(sim.settings, "lost_response_rate", 1.0)
+    random.seed(1)
+
+    target = risk.net_units(INSTRUMENT) + 1000
+    record = execution.execute_signal(INSTRUMENT, target, sim._mid(INSTRUMENT), signal_time=0)
+    assert record["units"] == 1000
+    assert len(set(calls)) == 1 and len(calls) >= 2
+    assert _sim_units() == target
+
+@pytest.mark.parametrize("hedging", [False, True])
+def test_flips_net_against_the_open_trade(sim, monkeypatch, hedging):
+    monkeypatch.setitem(sim.settings, "hedging", hedging)
+    target = abs(risk.net_units(INSTRUMENT)) + 1000
+    execution.execute_signal(INSTRUMENT, target, sim._mid(INSTRUMENT), signal_time=0)
+
+    execution.execute_signal(INSTRUMENT, -target, sim._mid(INSTRUMENT), signal_time=0)
+    assert _sim_units() == risk.net_units(INSTRUMENT) == -target
+    # The old legs were closed rather than hedged, so gross equals net
+    gross = sum(abs(t["units"]) for t in sim._trades.values() if t["instrument"] == INSTRUMENT)
+    assert gross == target
+
+def test_sim_hedging_account_opens_hedge_on_default_fill(sim, monkeypatch):
+    monkeypatch.setitem(sim.settings, "hedging", True)
+    with sim._lock:
+        before = len(sim._trades)
+        sim._fill_market_order({"id": sim._next_id(), "instrument": INSTRUMENT, "units": "100", "positionFill": "DEFAULT"})
+        sim._fill_market_order({"id": sim._next_id(), "instrument": INSTRUMENT, "units": "-100", "positionFill": "DEFAULT"})
+    assert len(sim._trades) == before + 2
@@ -0,0 +1,69 @@
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+
+import log_config
+
+def _record(i, created=None):
+    record = logging.LogRecord("test", logging.INFO, __file__, 0, "record %03d", (i,), None)
+    if created is not None:
+        record.created = created
+    return record
+
+def _numbers(path):
+    with open(path) as f:
+        return [int(json.loads(line)["msg"].split()[-1]) for line in f]
+
+def _handler(path, **kwargs):
+    handler = log_config.DailyRotatingFileHandler(str(path), encoding="utf-8", **kwargs)
+    handler.setFormatter(log_config.JsonFormatter())
+    return handler
+
+def test_size_rotation_keeps_newest_records(tmp_path):
+    path = tmp_path / "bot.jsonl"
+    handler = _handler(path, maxBytes=2000, backupCount=3)
+    for i in range(200):
+        handler.emit(_record(i))
+    handler.close()
+
+    files = [path] + [tmp_path / f"bot.jsonl.{n}" for n in (1, 2, 3)]
+    assert not (tmp_path / "bot.jsonl.4").exists()
+    kept = [n for f in reversed(files) for n in _numbers(f)]
+    # Oldest backup first: one unbroken run ending with the last record
+    assert kept == list(range(kept[0], 200))
+    assert all(f.stat().st_size <= 2000 for f in files)
+
+def test_rotates_at_midnight_utc(tmp_path):
+    path = tmp_path / "bot.jsonl"
+    handler = _handler(path, backupCount=3)
+    day_one = datetime(2025, 3, 10, 23, 59, tzinfo=timezone.utc).timestamp()
+    day_two = datetime(2025, 3, 11, 0, 1, tzinfo=timezone.utc).timestamp()
+    handler._day = datetime.fromtimestamp(day_one, timezone.utc).date()
+    for i in range(3):
+        handler.emit(_record(i, created=day_one))
+    for i in range(3, 5):
+        handler.emit(_record(i, created=day_two))
+    handler.close()
+
+    assert _numbers(tmp_path / "bot.jsonl.1") == [0, 1, 2]
+    assert _numbers(path) == [3, 4]
+
+def test_queued_exceptions_keep_message_and_traceback(tmp_path):
+    path = tmp_path / "bot.jsonl"
+    file_handler = _handler(path)
+    queue_handler = log_config.DroppingQueueHandler(queue.Queue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("test", logging.ERROR, __file__, 0, "failed %s", ("cycle",), None)
+        record.exc_info = sys.exc_info()
+    queue_handler.handle(record)
+    file_handler.handle(queue_handler.queue.get_nowait())
+    file_handler.close()
+
+    with open(path) as f:
+        entry = json.loads(f.readline())
+    assert entry["msg"] == "failed cycle"
+    assert entry["exc"].startswith("Traceback") and "ValueError: boom" in entry["exc"]
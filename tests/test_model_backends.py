@@ -0,0 +1,32 @@
+import config
+import model_backends
+
+def _result(backend, latency_ms, test_accuracy=55.0, confident_accuracy=60.0, confidence_coverage=20.0):
+    return {"backend": backend, "latency_ms": latency_ms, "test_accuracy": test_accuracy,
+            "confident_accuracy": confident_accuracy, "confidence_coverage": confidence_coverage}
+
+def test_best_backend_within_the_latency_budget_wins():
+    results = [
+        _result("ensemble", 40.0, confident_accuracy=70.0),  # Best, but over budget
+        _result("rf", 12.0, confident_accuracy=64.0),
+        _result("logreg", 0.5, confident_accuracy=61.0)
+    ]
+    assert model_backends.select(results, latency_budget_ms=25)["backend"] == "rf"
+    assert model_backends.select(results, latency_budget_ms=50)["backend"] == "ensemble"
+
+def test_fastest_backend_when_none_fits_the_budget():
+    results = [_result("rf", 30.0, confident_accuracy=64.0), _result("hgb", 28.0, confident_accuracy=58.0)]
+    assert model_backends.select(results, latency_budget_ms=25)["backend"] == "hgb"
+
+def test_confident_accuracy_needs_minimum_coverage():
+    rare = _result("rf", 5.0, test_accuracy=52.0, confident_accuracy=90.0,
+                   confidence_coverage=config.MODEL_MIN_COVERAGE / 2)
+    steady = _result("hgb", 5.0, test_accuracy=54.0, confident_accuracy=60.0)
+    assert model_backends._score(rare)[0] == 0.0
+    assert model_backends.select([rare, steady])["backend"] == "hgb"
+
+def test_ties_go_to_accuracy_then_speed():
+    slow = _result("rf", 10.0)
+    fast = _result("logreg", 1.0)
+    assert model_backends.select([slow, fast])["backend"] == "logreg"
+    assert model_backends.select([_result("rf", 10.0, test_accuracy=57.0), fast])["backend"] == "rf"
@@ -0,0 +1,94 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+import model
+import monitor
+import risk
+import state
+from utils import is_market_open, is_safe_trading_time
+
+TRAIN_BARS = config.CANDLE_COUNT
+
+def _candles(n, seed, vol_change=1.0):
+    """Mean-reverting M15 prices with a busier London session; vol_change scales volatility after training."""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2025-01-06", periods=n, freq="15min", tz="UTC")
+    vol = np.where((times.hour >= 7) & (times.hour < 17), 0.0009, 0.0004)
+    vol = vol * np.where(np.arange(n) >= TRAIN_BARS, vol_change, 1.0)
+    shocks = rng.normal(0, vol)
+    log_price = np.zeros(n)
+    for i in range(1, n):
+        log_price[i] = 0.993 * log_price[i - 1] + shocks[i]  # Roughly a one-day half-life
+    close = 1.27 * np.exp(log_price)
+    open_ = np.r_[1.27, close[:-1]]
+    wicks = np.abs(rng.normal(0, vol / 2, (2, n)))
+    high = np.maximum(open_, close) * (1 + wicks[0])
+    low = np.minimum(open_, close) * (1 - wicks[1])
+    volume = rng.integers(50, 500, n)
+    return [{"time": t.strftime("%Y-%m-%dT%H:%M:%S.000000000Z"), "complete": True, "volume": int(v),
+             "mid": {"o": f"{o:.5f}", "h": f"{h:.5f}", "l": f"{l:.5f}", "c": f"{c:.5f}"}}
+            for t, o, h, l, c, v in zip(times, open_, high, low, close, volume)]
+
+@pytest.fixture(autouse=True)
+def fresh_monitor(monkeypatch, tmp_path):
+    monkeypatch.setattr(monitor, "_reference", None)
+    monkeypatch.setattr(config, "MODEL_PATH", str(tmp_path / "model.pkl"))
+    monkeypatch.setattr(risk, "_instruments", {config.TRADING_INSTRUMENT: risk._default_meta(config.TRADING_INSTRUMENT)})
+    monkeypatch.delitem(state._data, "last_retrain_time", raising=False)
+    monitor._reset_live()
+    return tmp_path
+
+def _train_and_go_live(candles, stats_path, live_bars):
+    df = model.preprocess_candles(candles[:TRAIN_BARS], vwap_window=model.LIVE_CANDLE_COUNT - 1)
+    monitor.fit_reference(df[model.FEATURES], df["close"], path=str(stats_path))
+    # Past the retrain cooldown but well inside the age limit
+    monitor._reference["trained_at"] = (datetime.utcnow() - timedelta(hours=12)).isoformat()
+
+    decisions = []
+    for end in range(TRAIN_BARS, TRAIN_BARS + live_bars):
+        now = pd.Timestamp(candles[end]["time"]).tz_localize(None).to_pydatetime()
+        if not (is_market_open(now) and is_safe_trading_time(now)):
+            continue
+        # The live path: a prediction from the last 49 complete candles
+        window = model.preprocess_candles(candles[end - model.LIVE_CANDLE_COUNT + 1:end])
+        features = window.iloc[-1][model.FEATURES].to_dict()
+        monitor.observe(window, features, direction=len(decisions) % 2, confidence=0.5)
+        decisions.append(monitor.needs_retrain())
+    return decisions
+
+def test_stationary_prices_do_not_trigger_retrain(fresh_monitor):
+    decisions = _train_and_go_live(_candles(TRAIN_BARS + 700, seed=11), fresh_monitor / "stats.json", 700)
+    assert monitor.summary()["samples"] >= config.MONITOR_MIN_SAMPLES
+    assert not any(needed for needed, _ in decisions), [reason for _, reason in decisions if reason]
+
+def test_volatility_regime_change_triggers_retrain(fresh_monitor):
+    decisions = _train_and_go_live(_candles(TRAIN_BARS + 700, seed=11, vol_change=2.0), fresh_monitor / "stats.json", 700)
+    reasons = [reason for needed, reason in decisions if needed]
+    assert reasons and reasons[-1].startswith("drift")
+
+def test_reference_ignores_hour_and_compares_levels_to_close():
+    df = model.preprocess_candles(_candles(TRAIN_BARS, seed=3), vwap_window=model.LIVE_CANDLE_COUNT - 1)
+    reference = monitor.fit_reference(df[model.FEATURES], df["close"], path=os.devnull)
+    assert "hour" not in reference["features"]
+    assert max(abs(e) for e in reference["features"]["sma15"]["edges"]) < 0.05
+
+def test_age_limit_applies_without_training_statistics(fresh_monitor):
+    state._data["last_retrain_time"] = datetime.utcnow() - timedelta(hours=config.MAX_MODEL_AGE_HOURS + 1)
+    needed, reason = monitor.needs_retrain()
+    assert needed and "old" in reason
+
+    del state._data["last_retrain_time"]
+    model_path = fresh_monitor / "model.pkl"
+    model_path.write_bytes(b"")
+    stale = time.time() - (config.MAX_MODEL_AGE_HOURS + 1) * 3600
+    os.utime(model_path, (stale, stale))
+    assert monitor.needs_retrain()[0]
+
+    os.utime(model_path)
+    assert monitor.needs_retrain() == (False, None)
@@ -0,0 +1,101 @@
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import broker
+import config
+import model
+import model_backends
+import replay
+import risk
+
+INSTRUMENT = "GBP_USD"
+
+def _weekday_candles(start, end, seed=5):
+    """Synthetic M15 candles with no bars from Friday 22:00 to Sunday 21:00 UTC."""
+    times = pd.date_range(start, end, freq="15min", tz="UTC", inclusive="left")
+    closed = (times.weekday == 5) | ((times.weekday == 6) & (times.hour < 21)) | ((times.weekday == 4) & (times.hour >= 22))
+    times = times[~closed]
+    rng = np.random.default_rng(seed)
+    close = 1.27 * np.exp(np.cumsum(rng.normal(0, 0.0007, len(times))))
+    open_ = np.r_[1.27, close[:-1]]
+    wicks = np.abs(rng.normal(0, 0.0003, (2, len(times))))
+    high, low = np.maximum(open_, close) * (1 + wicks[0]), np.minimum(open_, close) * (1 - wicks[1])
+    return [{"time": t.strftime("%Y-%m-%dT%H:%M:%S.000000000Z"), "complete": True, "volume": int(v),
+             "mid": {"o": f"{o:.5f}", "h": f"{h:.5f}", "l": f"{l:.5f}", "c": f"{c:.5f}"}}
+            for t, o, h, l, c, v in zip(times, open_, high, low, close, rng.integers(50, 500, len(times)))]
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    """A cached weekday-only history and a model trained on it; any broker fetch is recorded."""
+    candles = _weekday_candles("2024-12-02", "2025-01-11")
+    monkeypatch.setattr(config, "HISTORY_CACHE_DIR", str(tmp_path / "history"))
+    monkeypatch.setattr(config, "MODEL_PATH", str(tmp_path / "model.pkl"))
+    monkeypatch.setattr(risk, "_instruments", {INSTRUMENT: risk._default_meta(INSTRUMENT)})
+
+    df = model.preprocess_candles(candles, vwap_window=model.LIVE_CANDLE_COUNT - 1)
+    X, y = model.create_features_labels(df)
+    joblib.dump(model_backends.build("logreg").fit(X, y), config.MODEL_PATH)
+
+    fetches = []
+    monkeypatch.setattr(broker, "get_candles", lambda *a, **k: fetches.append(("count", a, k)) or [])
+    monkeypatch.setattr(broker, "get_candles_range", lambda *a, **k: fetches.append(("range", a, k)) or [])
+
+    def write(subset):
+        os.makedirs(config.HISTORY_CACHE_DIR, exist_ok=True)
+        with open(replay._cache_path(INSTRUMENT, "M15"), "w") as f:
+            json.dump(subset, f)
+
+    return candles, write, fetches
+
+def _start_index(candles, start):
+    return next(i for i, c in enumerate(candles) if pd.Timestamp(c["time"]) >= pd.Timestamp(start, tz="UTC"))
+
+def test_monday_replay_covers_every_bar_from_cache(history):
+    candles, write, fetches = history
+    first = _start_index(candles, "2025-01-06")
+    # The cache starts just after a weekend, exactly the warm-up before Monday
+    write(candles[first - replay.WARMUP_CANDLES:])
+
+    trades, skipped = replay.replay("2025-01-06", "2025-01-07", INSTRUMENT, "M15")
+    stamps = sorted(r["timestamp"] for r in trades + skipped)
+    assert len(stamps) == 96
+    assert stamps[0] == "2025-01-06T00:15:00" and stamps[-1] == "2025-01-07T00:00:00"
+    assert not fetches
+
+def test_short_warmup_is_fetched_by_count(history):
+    candles, write, fetches = history
+    first = _start_index(candles, "2025-01-06")
+    write(candles[first - 10:])
+
+    replay.load_history(INSTRUMENT, "M15", "2025-01-06", "2025-01-07")
+    kind, args, kwargs = fetches[0]
+    assert kind == "count" and kwargs["to"] == "2025-01-06T00:00:00Z"
+    assert args[1] > replay.WARMUP_CANDLES
+
+def test_holes_in_the_cache_are_refetched(history):
+    candles, write, fetches = history
+    first = _start_index(candles, "2025-01-06")
+    write(candles[:first + 20] + candles[first + 60:])  # Ten hours missing on Monday
+
+    replay.load_history(INSTRUMENT, "M15", "2025-01-06", "2025-01-07")
+    assert [kind for kind, _, _ in fetches] == ["count", "range"]
+
+def test_exact_replay_matches_live_features(history):
+    candles, write, _ = history
+    write(candles)
+
+    trades, skipped = replay.replay("2025-01-07", "2025-01-08", INSTRUMENT, "M15", exact=True)
+    rows = [r for r in trades + skipped if r["indicators"]]
+    assert rows
+    position = {pd.Timestamp(c["time"]).tz_localize(None): i for i, c in enumerate(candles)}
+    for row in rows[::10]:
+        # The bar decided at timestamp T closed at T; live saw the 49 candles ending with it
+        end = position[pd.Timestamp(row["timestamp"]) - pd.Timedelta(minutes=15)] + 1
+        live = model.preprocess_candles(candles[end - model.LIVE_CANDLE_COUNT + 1:end]).iloc[-1]
+        for name in model.FEATURES:
+            assert row["indicators"][name] == pytest.approx(live[name], rel=1e-9, abs=1e-12)
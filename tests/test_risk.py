@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+import broker
+import config
+import model
+import oanda_sim
+import risk
+
+@pytest.fixture(autouse=True)
+def account(monkeypatch):
+    monkeypatch.setitem(risk._account, "nav", 10000.0)
+    monkeypatch.setitem(risk._account, "currency", "GBP")
+    monkeypatch.setattr(risk, "_conversions", {})
+    monkeypatch.setattr(risk, "_positions", {})
+    # Default metadata, so nothing here reaches the OANDA API
+    monkeypatch.setattr(risk, "_instruments", {
+        name: risk._default_meta(name) for name in ("GBP_USD", "EUR_USD", "USD_JPY", "EUR_GBP")
+    })
+
+def test_quote_in_account_currency():
+    # Losing 10 pips on 1 unit of EUR_GBP costs 0.001 GBP
+    assert risk.position_size("EUR_GBP", 0.85, sl_pips=10, risk_percent=0.01) == 100000
+
+def test_base_in_account_currency_converts_by_price():
+    assert risk.position_size("GBP_USD", 1.25, sl_pips=10, risk_percent=0.01) == 125000
+
+def test_crosses_without_conversion_are_not_sized():
+    assert risk.position_size("EUR_USD", 1.08) == 0
+    assert risk.position_size("USD_JPY", 150.0) == 0
+    ok, reason = risk.check_trade("USD_JPY", 1000, 150.0)
+    assert not ok and "JPY" in reason
+
+def test_unconverted_positions_block_new_trades():
+    risk.apply_fill("EUR_USD", 1000, 1.08)
+    ok, reason = risk.check_trade("GBP_USD", 1000, 1.25)
+    assert not ok and "EUR_USD" in reason
+    assert risk.exposure()["unconverted"] == ["EUR_USD"]
+
+def test_crosses_use_pricing_conversions(serve, monkeypatch):
+    monkeypatch.setattr(broker, "OANDA_API_URL", f"{serve(oanda_sim.app)}/v3")
+    price = broker.get_current_price("USD_JPY")
+    jpy_to_gbp = risk._conversions["JPY"]
+    gbp_usd = oanda_sim._mid("GBP_USD")
+    assert jpy_to_gbp == pytest.approx(1 / (oanda_sim._mid("USD_JPY") * gbp_usd), rel=1e-6)
+
+    units = risk.position_size("USD_JPY", price, sl_pips=10, risk_percent=0.01)
+    assert units == int(100 / (10 * 0.01 * jpy_to_gbp))
+    assert risk.check_trade("USD_JPY", units // 10, price) == (True, None)
+
+def test_labels_use_the_trading_instruments_pip(monkeypatch):
+    monkeypatch.setattr(config, "TRADING_INSTRUMENT", "USD_JPY")
+    monkeypatch.setattr(risk, "_instruments", {"USD_JPY": risk._default_meta("USD_JPY")})
+    # A 15-pip rise in yen terms hits a 10-pip take profit; in 0.0001 pips it never would
+    close = [150.0, 150.15] + [150.15] * 5
+    df = pd.DataFrame({"open": close, "high": close, "low": close, "close": close})
+    assert model.label_tp_sl(df, tp_pips=10, sl_pips=10)["direction"].iloc[0] == 1
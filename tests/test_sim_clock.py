@@ -0,0 +1,59 @@
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import broker
+import config
+import monitor
+import oanda_sim
+import utils
+
+@pytest.fixture
+def sim_clock(serve, monkeypatch):
+    url = serve(oanda_sim.app)
+    monkeypatch.setattr(config, "SIM_CLOCK_URL", f"{url}/sim/clock")
+    monkeypatch.setattr(utils, "_sim_clock", {"time": None, "speed": 1.0, "synced": 0.0})
+    monkeypatch.setitem(oanda_sim.settings, "speed", oanda_sim.settings["speed"])
+    monkeypatch.setattr(oanda_sim, "_clock", dict(oanda_sim._clock))
+
+    def set_clock(start, speed):
+        oanda_sim._clock.update({"sim": pd.Timestamp(start, tz="UTC"), "wall": time.monotonic()})
+        oanda_sim.settings["speed"] = speed
+        utils._sim_clock["time"] = None  # Resync on the next read
+
+    return url, set_clock
+
+def test_gating_follows_simulated_time(sim_clock):
+    _, set_clock = sim_clock
+    set_clock("2025-03-08T10:00", speed=1)  # Saturday
+    assert not utils.is_market_open()
+
+    set_clock("2025-03-10T10:00", speed=1)  # Monday morning
+    assert utils.is_market_open() and utils.is_safe_trading_time()
+    assert abs(utils.utc_now() - datetime(2025, 3, 10, 10)) < timedelta(minutes=1)
+
+def test_simulated_time_advances_between_syncs(sim_clock):
+    _, set_clock = sim_clock
+    set_clock("2025-03-10T10:00", speed=3600)
+    first = utils.utc_now()
+    time.sleep(0.2)
+    assert utils.utc_now() - first >= timedelta(minutes=10)
+
+def test_model_age_uses_simulated_time(sim_clock, monkeypatch):
+    _, set_clock = sim_clock
+    set_clock("2025-03-10T10:00", speed=1)
+    monkeypatch.setattr(monitor, "_reference", {"version": monitor.REFERENCE_VERSION, "features": {},
+                                                "trained_at": utils.utc_now().isoformat()})
+    assert monitor.needs_retrain() == (False, None)
+
+    set_clock(f"2025-03-{10 + config.MAX_MODEL_AGE_HOURS // 24 + 1}T10:00", speed=1)
+    needed, reason = monitor.needs_retrain()
+    assert needed and "old" in reason
+
+def test_order_create_transaction_keeps_market_order_type(sim_clock, monkeypatch):
+    url, _ = sim_clock
+    monkeypatch.setattr(broker, "OANDA_API_URL", f"{url}/v3")
+    result = broker.open_trade("GBP_USD", 100, client_id="sim-clock-test", price=oanda_sim._mid("GBP_USD"))
+    assert result["orderCreateTransaction"]["type"] == "MARKET_ORDER"
@@ -0,0 +1,25 @@
+import queue
+from datetime import datetime
+
+import numpy as np
+
+import state
+
+def test_values_survive_flush_and_reload(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.db")
+    monkeypatch.setattr(state, "_data", {})
+    monkeypatch.setattr(state, "_pending", queue.Queue())
+    monkeypatch.setattr(state, "_writer", None)
+    state.load(path)
+
+    trained = datetime(2025, 1, 6, 10, 15, 30)
+    state.set("last_retrain_time", trained)
+    state.set("model_backend", {"backend": "hgb", "test_accuracy": np.float64(0.61), "at": trained})
+    state.set("last_retrain_time", trained.replace(hour=11))  # Only the latest write per key is kept
+    state.flush()
+
+    monkeypatch.setattr(state, "_data", {})
+    state.load(path)
+    assert state.get("last_retrain_time") == datetime(2025, 1, 6, 11, 15, 30)
+    assert state.get("model_backend") == {"backend": "hgb", "test_accuracy": 0.61, "at": trained}
+    assert state.get("missing", "default") == "default"
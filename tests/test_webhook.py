@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+import telegram_bot
+import telegram_sim
+
+@pytest.fixture
+def client():
+    import main
+    return main.app.test_client()
+
+def _url():
+    return f"/webhook/{telegram_bot.config.TELEGRAM_TOKEN}"
+
+def test_non_object_bodies_are_rejected(client):
+    for body in ([1, 2], "update", 42, None):
+        assert client.post(_url(), json=body).status_code == 400
+    assert client.post(_url(), data="not json", content_type="application/json").status_code == 400
+
+def test_redelivered_updates_are_queued_once(client, monkeypatch):
+    monkeypatch.setattr(telegram_bot, "update_queue", telegram_bot.queue.Queue(maxsize=10))
+    update = telegram_sim.command_update(900001)
+    assert client.post(_url(), json=update).status_code == 200
+    assert client.post(_url(), json=update).status_code == 200
+    assert telegram_bot.update_queue.qsize() == 1
+
+def test_full_queue_answers_busy_and_forgets_update(client, monkeypatch):
+    monkeypatch.setattr(telegram_bot, "update_queue", telegram_bot.queue.Queue(maxsize=1))
+    assert client.post(_url(), json=telegram_sim.command_update(900101)).status_code == 200
+    assert client.post(_url(), json=telegram_sim.command_update(900102)).status_code == 503
+    telegram_bot.update_queue.get_nowait()
+    # The rejected update can be redelivered once there is room
+    assert client.post(_url(), json=telegram_sim.command_update(900102)).status_code == 200
+
+def test_commands_reply_through_fake_telegram(serve, monkeypatch):
+    base_url = serve(telegram_sim.app)
+    monkeypatch.setattr(telegram_bot, "bot", telegram_bot.Bot(telegram_bot.config.TELEGRAM_TOKEN, base_url=f"{base_url}/bot"))
+    telegram_bot.setup_webhook()
+
+    assert telegram_bot.handle_webhook(telegram_sim.command_update(900201, "/start")) == telegram_bot.WEBHOOK_QUEUED
+    telegram_bot.update_queue.join()
+
+    sent = telegram_sim.app.test_client().get("/sim/messages").get_json()
+    assert sent and sent[-1]["text"].startswith("👋 Bot is online")
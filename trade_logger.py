@@ -1,9 +1,25 @@
 import csv
 import os
+import logging
 import pandas as pd
 
+logger = logging.getLogger(__name__)
+
 TRADE_LOG_FILE = "trade_log.csv"
 SKIPPED_TRADE_LOG_FILE = "skipped_trades.csv"
+EXECUTION_LOG_FILE = "execution_log.csv"
+
+# Skip reasons shared by the live loop and replay.py so both journals compare directly
+SKIP_PAUSED = "⏸️ Bot paused"
+SKIP_MARKET_CLOSED = "❌ Market closed"
+SKIP_VOLATILE_HOUR = "🚫 Avoiding volatile trading hour"
+
+def low_confidence_reason(confidence):
+    return f"⚠️ Low confidence ({confidence:.2f})"
+
+def already_holding_reason(direction):
+    emoji = "🟢 Buy" if direction == 1 else "🔴 Sell" if direction == 0 else "⚪ Hold"
+    return f"Already holding a {emoji} position"
 
 def log_trade(trade_data):
     file_exists = os.path.isfile(TRADE_LOG_FILE)
@@ -14,6 +30,7 @@ def log_trade(trade_data):
         writer.writerow(trade_data)
 
 def log_skipped_trade(skipped_data):
+    logger.info("Trade skipped", extra={"reason": skipped_data["reason_skipped"]})
     file_exists = os.path.isfile(SKIPPED_TRADE_LOG_FILE)
     with open(SKIPPED_TRADE_LOG_FILE, mode="a", newline="") as file:
         writer = csv.DictWriter(file, fieldnames=skipped_data.keys())
@@ -21,6 +38,21 @@ def log_skipped_trade(skipped_data):
             writer.writeheader()
         writer.writerow(skipped_data)
 
+def log_execution(execution_data):
+    file_exists = os.path.isfile(EXECUTION_LOG_FILE)
+    with open(EXECUTION_LOG_FILE, mode="a", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=execution_data.keys())
+        if not file_exists:
+            writer.writeheader()
+        writer.writerow(execution_data)
+
+def write_rows(path, rows, fieldnames):
+    """Writes a whole journal in one pass (used for bulk replays)."""
+    with open(path, mode="w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
 def get_trade_summary(log_path=TRADE_LOG_FILE):
     try:
         df = pd.read_csv(log_path)
@@ -1,12 +1,41 @@
-from datetime import datetime
-import os
+from datetime import datetime, timedelta
+import logging
+import threading
+import time
+import pandas as pd
 import requests
 import config
 
-SCHEDULER_LOG_PATH = "scheduler_log.txt"
+logger = logging.getLogger(__name__)
 
-def is_market_open():
-    now = datetime.utcnow()
+SIM_CLOCK_REFRESH = 5  # Wall-clock seconds between simulator clock syncs
+_sim_clock = {"time": None, "speed": 1.0, "synced": 0.0}
+_sim_clock_lock = threading.Lock()
+
+def utc_now():
+    """Naive UTC now, or the simulator's time when config.SIM_CLOCK_URL is set."""
+    if not config.SIM_CLOCK_URL:
+        return datetime.utcnow()
+    with _sim_clock_lock:
+        if _sim_clock["time"] is None or time.monotonic() - _sim_clock["synced"] > SIM_CLOCK_REFRESH:
+            try:
+                response = requests.get(config.SIM_CLOCK_URL, timeout=5)
+                response.raise_for_status()
+                clock = response.json()
+                _sim_clock.update({
+                    "time": datetime.fromisoformat(clock["time"]),
+                    "speed": float(clock["speed"]),
+                    "synced": time.monotonic()
+                })
+            except (requests.RequestException, KeyError, ValueError) as e:
+                logger.warning("Simulator clock sync failed", extra={"error": str(e)})
+                if _sim_clock["time"] is None:
+                    return datetime.utcnow()
+        elapsed = time.monotonic() - _sim_clock["synced"]
+        return _sim_clock["time"] + timedelta(seconds=elapsed * _sim_clock["speed"])
+
+def is_market_open(now=None):
+    now = now or utc_now()
     weekday = now.weekday()
     hour = now.hour
 
@@ -18,9 +47,9 @@ def is_market_open():
         return False
     return True
 
-def is_safe_trading_time():
+def is_safe_trading_time(now=None):
     """Avoid high-volatility times like session open/close and overnight illiquidity."""
-    now = datetime.utcnow()
+    now = now or utc_now()
     hour = now.hour
     minute = now.minute
     time_float = hour + (minute / 60)
@@ -43,17 +72,28 @@ def is_safe_trading_time():
 
     return True
 
-def log_scheduler_message(message):
-    now = datetime.utcnow()
-    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+def market_open_mask(times):
+    """Vectorised is_market_open() over a pandas DatetimeIndex (UTC)."""
+    weekday = times.weekday
+    hour = times.hour
+    closed = (weekday == 5) | ((weekday == 6) & (hour < 21)) | ((weekday == 4) & (hour >= 22))
+    return ~closed
+
+def safe_trading_mask(times):
+    """Vectorised is_safe_trading_time() over a pandas DatetimeIndex (UTC)."""
+    time_float = times.hour + times.minute / 60
+    unsafe = (
+        ((time_float >= 7) & (time_float < 7.5)) |
+        ((time_float >= 12) & (time_float < 12.5)) |
+        ((time_float >= 20.5) & (time_float < 21)) |
+        (time_float >= 21) | (time_float < 6)
+    )
+    return ~unsafe
 
-    # Reset the file at 00:00 UTC
-    if now.strftime("%H:%M") == "00:00":
-        with open(SCHEDULER_LOG_PATH, "w") as f:
-            f.write(f"{timestamp} - {message}\n")
-    else:
-        with open(SCHEDULER_LOG_PATH, "a") as f:
-            f.write(f"{timestamp} - {message}\n")
+def granularity_delta(granularity):
+    """Bar length of an OANDA granularity such as "M15" or "H1"."""
+    units = {"S": "s", "M": "min", "H": "h", "D": "D"}
+    return pd.Timedelta(int(granularity[1:] or 1), units[granularity[0]])
 
 def format_gbp(amount):
     """Format a float as British Pound currency (e.g., £1,234.56)"""
@@ -64,7 +104,7 @@ def format_gbp(amount):
 
 def get_equity():
     """Fetch live account equity (NAV) from OANDA API"""
-    url = f"https://api-fxpractice.oanda.com/v3/accounts/{config.OANDA_ACCOUNT_ID}/summary"
+    url = f"{config.OANDA_URL}/accounts/{config.OANDA_ACCOUNT_ID}/summary"
     headers = {
         "Authorization": f"Bearer {config.OANDA_API_KEY}"
     }
@@ -74,5 +114,5 @@ def get_equity():
         data = r.json()
         return float(data["account"]["NAV"])
     except Exception as e:
-        print(f"[utils.py] Equity fetch failed: {e}")
+        logger.warning("Equity fetch failed", extra={"error": str(e)})
         return 0.0
\ No newline at end of file